@@ -0,0 +1,29 @@
+import random
+from typing import Sequence
+
+import torch
+
+
+class BatchRandomFlipRotate90:
+    """Device-side replacement for the common per-sample transforms.
+
+    Applies the random flips and the 90-degree rotation of
+    WkwData.get_common_transforms to a whole (N, C, H, W) batch after it has
+    been moved to the device: one flip/rot90 kernel per batch instead of two
+    Python-level tensor ops per sample inside the loader workers. The random
+    draws are per batch rather than per sample.
+    """
+
+    def __init__(self, p_flip: float = 0.5, mult_90: Sequence[int] = None):
+        if mult_90 is None:
+            mult_90 = [0, 1, 2, 3]
+        self.p_flip = p_flip
+        self.mult_90 = mult_90
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        if random.random() < self.p_flip:
+            batch = torch.flip(batch, [2])
+        if random.random() < self.p_flip:
+            batch = torch.flip(batch, [3])
+        batch = torch.rot90(batch, random.choice(self.mult_90), [2, 3])
+        return batch
@@ -0,0 +1,67 @@
+"""Device-side prefetching of DataLoader batches.
+
+Even with persistent workers the first batches of an epoch stall while the
+worker queues refill, and every batch pays its host-to-device copy on the
+compute stream. EpochPrefetcher hides both: it stages the next batch onto the
+device over a dedicated CUDA stream while the current batch is being consumed,
+so the copy overlaps the gradient update.
+"""
+import torch
+
+
+class EpochPrefetcher:
+    """Iterable wrapper that keeps one batch staged on the device.
+
+    Wrap a DataLoader whose batches are dicts of tensors (the WkwData collate
+    format); tensor values arrive on the device, everything else passes
+    through. On CPU devices the wrapper is a transparent pass-through.
+    Unknown attributes (batch_sampler, batch_size, ...) are delegated to the
+    wrapped loader so consumers that introspect the loader keep working.
+    """
+
+    def __init__(self, loader, device):
+        self.loader = loader
+        self.device = torch.device(device)
+        # The copy stream is created lazily so construction can happen before
+        # the run selects its GPU
+        self._stream = None
+
+    def __len__(self):
+        return len(self.loader)
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def _to_device(self, batch):
+        return {key: value.to(self.device, non_blocking=True)
+                if torch.is_tensor(value) else value
+                for key, value in batch.items()}
+
+    def _preload(self, loader_iter):
+        try:
+            batch = next(loader_iter)
+        except StopIteration:
+            return None
+        with torch.cuda.stream(self._stream):
+            return self._to_device(batch)
+
+    def __iter__(self):
+        if self.device.type != 'cuda':
+            yield from self.loader
+            return
+        if self._stream is None:
+            self._stream = torch.cuda.Stream(self.device)
+        loader_iter = iter(self.loader)
+        next_batch = self._preload(loader_iter)
+        while next_batch is not None:
+            # Compute may not touch the staged tensors before the copy stream
+            # is done with them; record_stream keeps the allocator from
+            # recycling their memory while compute still reads it
+            current = torch.cuda.current_stream(self.device)
+            current.wait_stream(self._stream)
+            batch = next_batch
+            for value in batch.values():
+                if torch.is_tensor(value):
+                    value.record_stream(current)
+            next_batch = self._preload(loader_iter)
+            yield batch
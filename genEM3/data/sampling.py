@@ -9,6 +9,27 @@ from torch.utils.data.sampler import WeightedRandomSampler
 from genEM3.data.wkwdata import WkwData
 
 
+class TensorSubsetRandomSampler(Sampler):
+    """Samples a fixed index subset in random order.
+
+    SubsetRandomSampler re-indexes its Python list element by element every
+    epoch; holding the indices as one LongTensor makes each epoch a single
+    torch.randperm gather in C.
+
+    Arguments:
+        indices: sequence of sample indices to draw from
+    """
+
+    def __init__(self, indices):
+        self.indices = torch.as_tensor(indices, dtype=torch.long)
+
+    def __iter__(self):
+        return iter(self.indices[torch.randperm(len(self.indices))].tolist())
+
+    def __len__(self):
+        return len(self.indices)
+
+
 class subsetWeightedSampler(Sampler):
     """Sampler for generating a weighted random subset of the given dataset  
 
@@ -162,6 +183,35 @@ class subsetWeightedSampler(Sampler):
             print(f'Total debris fraction: {total_frac_debris * 100:.2f} %\n_____')
 
 
+class lazyDataLoaderList(list):
+    """List of per-block loader dictionaries that builds each entry on first access.
+
+    Constructing a loader dict per imbalance block up front forks num_workers
+    processes and opens wkw handles for every block at startup, while the
+    Trainer only ever uses one block at a time. A list subclass keeps the
+    isinstance(list) contract of Trainer intact.
+    """
+
+    def __init__(self, dataset: WkwData, fraction_debris_per_block, **loader_kwargs):
+        super().__init__([None] * len(fraction_debris_per_block))
+        self._dataset = dataset
+        self._fraction_debris_per_block = list(fraction_debris_per_block)
+        self._loader_kwargs = loader_kwargs
+
+    def __getitem__(self, index):
+        if super().__getitem__(index) is None:
+            super().__setitem__(index, subsetWeightedSampler.get_data_loaders(
+                self._dataset,
+                fraction_debris=self._fraction_debris_per_block[index],
+                **self._loader_kwargs))
+        return super().__getitem__(index)
+
+    def __iter__(self):
+        # Route iteration through __getitem__ so consumers never see the None
+        # placeholders of entries that have not been built yet
+        return (self[index] for index in range(len(self)))
+
+
 def data_loaders_split(params: dict):
     """
     Creats data loaders for train, validation and test sections of data
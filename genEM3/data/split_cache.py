@@ -0,0 +1,61 @@
+"""Persist the train/validation/test index split across script runs.
+
+WkwData.get_data_ind_splits draws a fresh permutation over all samples at
+every startup, so quick-iteration runs pay an O(N) split (and get different
+splits when the seed changes). load_or_build caches the index triple on disk
+keyed by the datasources json mtime, the split ratios and the RNG seed, and
+only recomputes when any of those change.
+"""
+import hashlib
+import os
+
+import torch
+
+from genEM3.data.wkwdata import DataSplit, WkwData
+
+# Matches the seed of the instance-local RNG in WkwData.__init__
+SPLIT_SEED = 1337
+
+
+def _cache_path(datasources_json_path: str, data_split: DataSplit, dataset: WkwData) -> str:
+    """Path of the cached split, unique per (json mtime, ratios, seed, sample count).
+
+    The sample count folds the dataset geometry (input_shape, stride, bboxes)
+    into the key, so a split built for one tiling is never reused for another.
+    """
+    mtime = os.path.getmtime(datasources_json_path)
+    key = repr((mtime, tuple(data_split), SPLIT_SEED, len(dataset)))
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    return os.path.join(dataset.cache_HDD_root, 'split_{}.pt'.format(digest))
+
+
+def load_or_build(datasources_json_path: str, data_split: DataSplit, dataset: WkwData):
+    """Load the cached index split for the dataset, computing it on a miss.
+
+    The dataset should be constructed without a data_split so the permutation
+    is only drawn when no cached split exists. Assigns data_train_inds,
+    data_validation_inds and data_test_inds on the dataset and returns them
+    as a triple.
+    """
+    cache_path = _cache_path(datasources_json_path, data_split, dataset)
+    if os.path.exists(cache_path):
+        splits = torch.load(cache_path, weights_only=True)
+        all_inds = splits['train'] + splits['validation'] + splits['test']
+        if all_inds and max(all_inds) >= len(dataset):
+            raise ValueError('cached split at {} indexes beyond the dataset '
+                             '({} samples); delete the stale cache'.format(cache_path, len(dataset)))
+        dataset.data_split = data_split
+        dataset.data_train_inds = splits['train']
+        dataset.data_validation_inds = splits['validation']
+        dataset.data_test_inds = splits['test']
+    else:
+        dataset.data_split = data_split
+        dataset.get_data_ind_splits()
+        os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+        # Write-then-rename so a killed run never leaves a truncated cache
+        tmp_path = cache_path + '.tmp'
+        torch.save({'train': dataset.data_train_inds,
+                    'validation': dataset.data_validation_inds,
+                    'test': dataset.data_test_inds}, tmp_path)
+        os.replace(tmp_path, cache_path)
+    return dataset.data_train_inds, dataset.data_validation_inds, dataset.data_test_inds
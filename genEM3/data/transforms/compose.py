@@ -4,7 +4,22 @@ class Compose:
 
     def __init__(self, transforms: Sequence[Callable]):
 
-        self.transforms = transforms
+        self.transforms = self._fuse_affine_runs(transforms)
+
+    @staticmethod
+    def _fuse_affine_runs(transforms: Sequence[Callable]):
+
+        # Collapse runs of adjacent affine transforms (those exposing .fuse) into a
+        # single equivalent transform, so a chain of pointwise ops costs one pass
+        fused = []
+        for transform in transforms:
+            if fused and hasattr(fused[-1], 'fuse') and hasattr(transform, 'fuse'):
+                combined = fused[-1].fuse(transform)
+                if combined is not None:
+                    fused[-1] = combined
+                    continue
+            fused.append(transform)
+        return fused
 
     def __call__(self, x):
 
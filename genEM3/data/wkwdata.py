@@ -1,14 +1,18 @@
+import atexit
 import os
 import json
 import random
 from collections import namedtuple
-from typing import Tuple, Sequence, List, Callable, Dict, NamedTuple, Union
 from functools import lru_cache
+from itertools import chain
+from typing import Tuple, Sequence, List, Callable, Dict, NamedTuple, Union
 
 import numpy as np
 from scipy.interpolate import griddata
+from scipy.ndimage import distance_transform_edt
 import matplotlib.pyplot as plt
 import torch
+import torch.nn.functional as F
 from torch.utils.data import Dataset
 import wkw
 import pandas as pd
@@ -16,7 +20,87 @@ import pandas as pd
 from genEM3.util.path import get_data_dir
 from genEM3.data import transforms
 
-np.random.seed(1337)
+try:
+    from numba import njit
+
+    @njit(cache=True)
+    def _bounding_faces_nonzero(data):
+        """Check that all six bounding faces of a (C, X, Y, Z) cube contain data,
+        scanning each face and returning early at the first all-zero face"""
+        n0, n1, n2, n3 = data.shape
+        for axis in range(3):
+            for face in range(2):
+                found = False
+                for a in range(n0):
+                    if found:
+                        break
+                    for b in range(n1 if axis != 0 else 1):
+                        if found:
+                            break
+                        for c in range(n2 if axis != 1 else 1):
+                            if found:
+                                break
+                            for d in range(n3 if axis != 2 else 1):
+                                i1 = b if axis != 0 else (0 if face == 0 else n1 - 1)
+                                i2 = c if axis != 1 else (0 if face == 0 else n2 - 1)
+                                i3 = d if axis != 2 else (0 if face == 0 else n3 - 1)
+                                if data[a, i1, i2, i3] != 0:
+                                    found = True
+                                    break
+                if not found:
+                    return False
+        return True
+except ImportError:
+    # Numba is optional; the completeness check falls back to np.any reductions
+    _bounding_faces_nonzero = None
+
+try:
+    # Optional faster parser for the large per-patch datasource jsons
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _load_json(json_path):
+    """Read the whole file and parse the buffer in one go: json.load on a raw
+    file object issues many small reads"""
+    with open(json_path, 'rb') as f:
+        buffer = f.read()
+    if orjson is not None:
+        return orjson.loads(buffer)
+    return json.loads(buffer)
+
+
+# Per-process cache of open wkw dataset handles: opening on every read costs a
+# header parse plus file descriptor churn per sample. Handles are opened lazily
+# and cannot cross a fork, so the cache is invalidated in child processes (e.g.
+# DataLoader workers) and closed at interpreter exit.
+_WKW_HANDLES = {}
+_WKW_HANDLES_PID = None
+
+
+def _wkw_open_cached(wkw_path):
+    global _WKW_HANDLES_PID
+    pid = os.getpid()
+    if _WKW_HANDLES_PID != pid:
+        # Forked child: the inherited handles belong to the parent, drop them
+        _WKW_HANDLES.clear()
+        _WKW_HANDLES_PID = pid
+    handle = _WKW_HANDLES.get(wkw_path)
+    if handle is None:
+        handle = wkw.Dataset.open(wkw_path)
+        _WKW_HANDLES[wkw_path] = handle
+    return handle
+
+
+def _close_wkw_handles():
+    if _WKW_HANDLES_PID == os.getpid():
+        for handle in _WKW_HANDLES.values():
+            handle.close()
+    _WKW_HANDLES.clear()
+
+
+atexit.register(_close_wkw_handles)
 
 DataSourceDefaults = (
     ("id", str),
@@ -53,11 +137,15 @@ class WkwData(Dataset):
                  data_split: DataSplit = None,
                  stride: Tuple[int, int, int] = None,
                  normalize: bool = True,
+                 normalize_in_collate: bool = False,
+                 cache_dtype: torch.dtype = torch.float32,
                  transforms: Callable = None,
                  pad_target: bool = False,
                  cache_RAM: bool = True,
+                 cache_RAM_pinned: bool = False,
                  cache_HDD: bool = False,
-                 cache_HDD_root: str = None):
+                 cache_HDD_root: str = None,
+                 sample_cache_max_bytes: int = 0):
 
         """
                 Args:
@@ -95,16 +183,41 @@ class WkwData(Dataset):
                     normalize:
                         If true, patches are normalized to standard normal using input mean and std specified in
                         the respective datasource
+                    normalize_in_collate:
+                        If true, __getitem__ returns the input patch as the native (typically uint8)
+                        NumPy array and defers normalization plus the float32 conversion to
+                        `collate_fn`, which applies them once on the stacked batch instead of once
+                        per sample. Per-sample transforms are not applied in this mode; apply any
+                        augmentation on the collated batch instead.
+                    cache_dtype:
+                        dtype of the input tensors handed out by the dataset. With
+                        torch.uint8 the patches stay in their native 8-bit encoding
+                        (normalization is skipped), cutting RAM and host-to-device
+                        volume to a quarter of float32; dequantize on the device by
+                        prepending genEM3.model.preproc.Normalize to the model.
                     pad_target:
                         If true, target patches are padded to the same shape as input patches
                     cache_RAM:
                         If true, all data is cached into RAM for faster training.
+                    cache_RAM_pinned:
+                        If true, decoded and normalized input patches are kept in one
+                        contiguous per-sample float32 tensor (pinned when CUDA is
+                        available), filled lazily on first access. Repeat epochs serve
+                        inputs as views into this tensor and collate gathers them into a
+                        pre-pinned batch, skipping the DataLoader's pageable-to-pinned
+                        copy. With worker processes each worker fills its own copy, so
+                        this is most effective with num_workers=0 or persistent workers.
                     cache_HDD:
                         If true, all data is cached to HDD for faster training (Mostly relevant if data is hosted at a
                         remote location and bandwidth to local instance is limited or multiple processes need to access
                         the same path).
                     cache_HDD_root:
                         Path on the local filesystem where HDD cache should be created
+                    sample_cache_max_bytes:
+                        If > 0, decoded per-sample input patches are additionally cached in RAM
+                        (keyed by sample_idx, bounded to this many bytes, FIFO eviction). Repeat
+                        epochs hit the cache and skip the read and slice entirely; the expected
+                        hit rate is the ratio of cache size to dataset size.
                 """
 
         if cache_HDD_root is None:
@@ -121,12 +234,33 @@ class WkwData(Dataset):
             self.stride = stride
 
         self.normalize = normalize
+        self.normalize_in_collate = normalize_in_collate
+        if normalize_in_collate and any(source.target_binary != 1 for source in data_sources):
+            # Autoencoder-style sources copy the input into the target before
+            # collate_fn normalizes the inputs, so the model would train
+            # normalized inputs against raw 0-255 targets
+            raise ValueError('normalize_in_collate requires binary targets; '
+                             'non-binary targets are built from the raw input '
+                             'before collate_fn normalizes it')
+        self.cache_dtype = cache_dtype
         self.transforms = transforms
         self.pad_target = pad_target
+        # Constant shapes, so the target pad width is computed once; ordered for
+        # torch.nn.functional.pad, which pads the last dimension first
+        pad_shape = np.floor((np.asarray(input_shape) - np.asarray(target_shape)) / 2).astype(int)
+        self._pad_width = (int(pad_shape[2]),) * 2 + (int(pad_shape[1]),) * 2 + (int(pad_shape[0]),) * 2
         self.cache_RAM = cache_RAM
+        self.cache_RAM_pinned = cache_RAM_pinned
         self.cache_HDD = cache_HDD
 
         self.cache_HDD_root = cache_HDD_root
+        # Instance-local RNG: seeding the global numpy RNG at import time made
+        # every importer (and every DataLoader worker) deterministic and identical
+        self._rng = np.random.default_rng(1337)
+        self.sample_cache_max_bytes = sample_cache_max_bytes
+        self._sample_cache = dict()
+        self._sample_cache_bytes = 0
+        self._batch_prefetch = dict()
         self.data_cache_input = dict()
         self.data_cache_output = dict()
         self.data_meshes = []
@@ -137,6 +271,7 @@ class WkwData(Dataset):
         self.data_validation_inds = []
         self.data_test_inds = []
 
+        self._build_source_soa()
         self.get_data_meshes()
         self.get_data_ind_ranges()
 
@@ -146,6 +281,18 @@ class WkwData(Dataset):
         if cache_RAM | cache_HDD:
             self.fill_caches()
 
+        self._pinned_cache = None
+        self._pinned_filled = None
+        if cache_RAM_pinned:
+            # One contiguous SoA tensor over all samples; per-sample shape matches
+            # the (squeezed) tensors handed out by get_ordered_sample
+            sample_shape = (1, int(input_shape[0]), int(input_shape[1]))
+            if int(input_shape[2]) != 1:
+                sample_shape += (int(input_shape[2]),)
+            self._pinned_cache = torch.empty((len(self),) + sample_shape, dtype=torch.float32,
+                                             pin_memory=torch.cuda.is_available())
+            self._pinned_filled = np.zeros(len(self), dtype=bool)
+
     def __len__(self):
         """This method returns the length of the dataset"""
         return self.data_inds_max[-1] + 1
@@ -154,12 +301,77 @@ class WkwData(Dataset):
         """indexing the dataset calls this method"""
         return self.get_ordered_sample(idx)
 
+    def __getitems__(self, indices):
+        """Batched fetch hook (used by newer torch DataLoaders in place of one
+        __getitem__ call per sample). Without a RAM/HDD cache each sample is a
+        separate small wkw read; here the samples of a batch that share a data
+        source are served from one read of their enclosing bbox instead, and the
+        patches are handed to the regular per-sample path via _batch_prefetch."""
+        indices = [int(idx) for idx in indices]
+        if not (self.cache_RAM | self.cache_HDD):
+            source_by_sample = self._source_idx_by_sample[indices]
+            sample_shape = np.asarray(self.input_shape, dtype=np.int64)
+            for source_idx in np.unique(source_by_sample):
+                group = [idx for idx, src in zip(indices, source_by_sample) if src == source_idx]
+                if len(group) < 2:
+                    continue
+                origins = self._origin_input[group]
+                corner_min = origins.min(axis=0)
+                extent = origins.max(axis=0) + sample_shape - corner_min
+                # Scattered indices can make the enclosing bbox arbitrarily large;
+                # only coalesce when it stays within 4x the payload volume
+                if np.prod(extent) > 4 * len(group) * np.prod(sample_shape):
+                    continue
+                union_bbox = corner_min.tolist() + extent.tolist()
+                data = self.wkw_read(self.data_sources[int(source_idx)].input_path, union_bbox)
+                for sample_idx, origin in zip(group, origins):
+                    offset = origin - corner_min
+                    self._batch_prefetch[sample_idx] = data[
+                        :,
+                        offset[0]:offset[0] + sample_shape[0],
+                        offset[1]:offset[1] + sample_shape[1],
+                        offset[2]:offset[2] + sample_shape[2],
+                        ]
+        return [self.get_ordered_sample(idx) for idx in indices]
+
+    def _build_source_soa(self):
+        """Builds a structure-of-arrays view over the data sources, so lookups that
+        span all sources are single array gathers instead of Python comprehensions.
+        Must be rebuilt whenever self.data_sources is modified."""
+        def _as_float32(values):
+            try:
+                return np.asarray(values, dtype=np.float32)
+            except (TypeError, ValueError):
+                return np.asarray(values, dtype=object)
+
+        def _as_int64(values):
+            try:
+                return np.asarray(values, dtype=np.int64)
+            except (TypeError, ValueError):
+                return np.asarray(values, dtype=object)
+
+        sources = self.data_sources
+        self._src = {
+            'id': np.asarray([source.id for source in sources], dtype=object),
+            'input_path': np.asarray([source.input_path for source in sources], dtype=object),
+            'input_bbox': _as_int64([source.input_bbox for source in sources]),
+            'input_mean': _as_float32([source.input_mean for source in sources]),
+            'input_std': _as_float32([source.input_std for source in sources]),
+            'target_path': np.asarray([source.target_path for source in sources], dtype=object),
+            'target_bbox': _as_int64([source.target_bbox for source in sources]),
+            'target_class': _as_float32([source.target_class for source in sources]),
+            'target_binary': _as_int64([source.target_binary for source in sources]),
+        }
+
     def get_data_meshes(self):
         """ Return the meshgrid for each datasource in self.datasources """
         [self.data_meshes.append(self.get_data_mesh(i)) for i in range(len(self.data_sources))]
 
     def get_data_mesh(self, data_source_idx):
-        """ Returns the grid of x, y and z locations for an individual datasource"""
+        """ Returns the grid of x, y and z locations for an individual datasource.
+        The grid is stored as three 1-D coordinate vectors plus the shape of the
+        (virtual) dense mesh; a sample's coordinate is looked up on demand instead
+        of materializing the full O(Nx*Ny*Nz) meshgrid arrays"""
         corner_min_target = np.floor(np.asarray(self.data_sources[data_source_idx].input_bbox[0:3]) +
                                     np.asarray(self.input_shape) / 2).astype(int)
         n_fits = np.floor((np.asarray(self.data_sources[data_source_idx].input_bbox[3:6]) -
@@ -168,54 +380,73 @@ class WkwData(Dataset):
         x = np.arange(corner_min_target[0], corner_max_target[0] + self.stride[0], self.stride[0])
         y = np.arange(corner_min_target[1], corner_max_target[1] + self.stride[1], self.stride[1])
         z = np.arange(corner_min_target[2], corner_max_target[2] + self.stride[2], self.stride[2])
-        xm, ym, zm = np.meshgrid(x, y, z)
-        mesh_target = {'x': xm, 'y': ym, 'z': zm}
-        mesh_input = {'x': xm, 'y': ym, 'z': zm}
-
-        return {'input': mesh_input, 'target': mesh_target}
+        # np.meshgrid's default 'xy' indexing puts y first; keep that ordering in
+        # the shape so the linear sample indices stay identical to the dense mesh
+        shape = (len(y), len(x), len(z))
+        # Input and target samples are centered on the same grid points, so a
+        # single mesh dict serves both; only the sample shape differs downstream
+        return {'x': x, 'y': y, 'z': z, 'shape': shape}
 
     def get_data_ind_ranges(self):
 
         """ Computes the global linear idx limits contained in the respective training data cubes"""
-        for source_idx, _ in enumerate(range(len(self.data_sources))):
-            if source_idx == 0:
-                # Minimum index is 0 for the initial group 
-                self.data_inds_min.append(0)
-            else:
-                # The minimum of all subsequent data sources is the maximum of the previous 
-                # group plus 1
-                self.data_inds_min.append(self.data_inds_max[source_idx - 1] + 1)
-            # The maximum index is the minimum + length of each data source minus 1
-            self.data_inds_max.append(self.data_inds_min[source_idx] +
-                                      self.data_meshes[source_idx]['target']['x'].size - 1)
+        # The maximum of each source is the running total of sample counts minus 1,
+        # the minimum is the previous maximum plus 1: a single cumsum pass
+        sizes = np.asarray([int(np.prod(mesh['shape'])) for mesh in self.data_meshes],
+                           dtype=np.int64)
+        data_inds_max = np.cumsum(sizes) - 1
+        data_inds_min = data_inds_max - sizes + 1
+        self.data_inds_min = data_inds_min.tolist()
+        self.data_inds_max = data_inds_max.tolist()
+        # Cached sorted array so the per-sample source lookup is a binary search
+        # instead of rebuilding an array and scanning it on every __getitem__
+        self._data_inds_max_arr = data_inds_max
+        # Flat per-sample lookup tables: consumers such as weighted samplers call
+        # the source/target getters once per sample, so a single array load beats
+        # any per-call search or LRU machinery
+        self._source_idx_by_sample = np.repeat(np.arange(len(sizes)), sizes)
+        target_classes = np.asarray([data_source.target_class for data_source in self.data_sources])
+        self._target_class_by_sample = np.repeat(target_classes, sizes, axis=0)
+        # Precomputed per-sample center coordinates: one unravel per source at
+        # init turns the per-sample bbox construction into a single table gather
+        centers = np.empty((int(sizes.sum()), 3), dtype=np.int64)
+        for source_idx, mesh in enumerate(self.data_meshes):
+            inds_y, inds_x, inds_z = np.unravel_index(np.arange(sizes[source_idx]), mesh['shape'])
+            lo = self.data_inds_min[source_idx]
+            hi = self.data_inds_max[source_idx] + 1
+            centers[lo:hi, 0] = mesh['x'][inds_x]
+            centers[lo:hi, 1] = mesh['y'][inds_y]
+            centers[lo:hi, 2] = mesh['z'][inds_z]
+        self._center_by_sample = centers
+        self._origin_input = centers - np.asarray(self.input_shape, dtype=np.int64) // 2
+        self._origin_target = centers - np.asarray(self.output_shape, dtype=np.int64) // 2
 
     def get_data_ind_splits(self):
         # Use different strategies when the data_split is a fraction rather than integers
         if type(self.data_split.train) is float:
             # Maximum index is the total number of training examples from all data sources
             maxIndex = len(self)
-            # Range creates a list starting at 0 and ending at maxIndex-1 of indices
-            data_inds_all = list(range(maxIndex))
-            # Here that list gets randomly permutated
-            data_inds_all_rand = np.random.permutation(data_inds_all)
+            # Permute the index range directly in C instead of materializing a Python
+            # int list and copying it into the permutation
+            data_inds_all_rand = self._rng.permutation(maxIndex)
             # Training, validation and test indices comes from the data_split fraction making sure that none of the training data is ignored
             # These indices are randomized
             train_idx_max = int(self.data_split.train*maxIndex)
-            data_train_inds = list(data_inds_all_rand[0:train_idx_max])
+            data_train_inds = data_inds_all_rand[0:train_idx_max].tolist()
             validation_idx_max = train_idx_max + int(self.data_split.validation * maxIndex)
-            data_validation_inds = list(data_inds_all_rand[train_idx_max:validation_idx_max])
+            data_validation_inds = data_inds_all_rand[train_idx_max:validation_idx_max].tolist()
             test_idx_max = validation_idx_max + int(self.data_split.test * maxIndex)
-            data_test_inds = list(data_inds_all_rand[validation_idx_max:test_idx_max])
-            # Sometimes one index is left behind from the rounding effect
-            all_inds_set = set(data_inds_all)
-            combined_inds_set = set(data_train_inds + data_validation_inds + data_test_inds)
-            index_left = list(all_inds_set - combined_inds_set)
+            data_test_inds = data_inds_all_rand[validation_idx_max:test_idx_max].tolist()
+            # Sometimes one index is left behind from the rounding effect. The splits
+            # partition a permutation of range(maxIndex), so the leftovers are simply
+            # the tail of the permutation — no O(N) set constructions needed
+            index_left = data_inds_all_rand[test_idx_max:].tolist()
             if len(index_left) == 1:
                 # Add the index left behind to the training split
                 data_train_inds = data_train_inds+index_left
             elif len(index_left) > 1:
                 raise Exception("more than one index left behind in splitting the data into train, val and test")
-            assert len(self) == len(set(data_train_inds + data_validation_inds + data_test_inds)), 'Length check for the splits failed'
+            assert len(self) == len(data_train_inds) + len(data_validation_inds) + len(data_test_inds), 'Length check for the splits failed'
 
         else:
             data_train_inds = []
@@ -248,22 +479,68 @@ class WkwData(Dataset):
 
         # Inputs
         source_idx, bbox_input = self.get_bbox_for_sample_idx(sample_idx, sample_type='input')
-        if self.cache_RAM | self.cache_HDD:
-            input_ = self.wkw_read_cached(source_idx, 'input', bbox_input)
+        # The pinned per-sample cache stores the decoded, normalized and squeezed
+        # tensor, so a hit bypasses the read/normalize/convert path entirely
+        # Pop unconditionally: __getitems__ stages union-read slices for every
+        # requested sample, and an entry left behind on a pinned-cache hit would
+        # keep its whole union buffer alive and grow the dict without bound
+        prefetched = self._batch_prefetch.pop(sample_idx, None)
+        use_pinned = (self._pinned_cache is not None and not self.normalize_in_collate
+                      and self.cache_dtype is torch.float32 and normalize == self.normalize)
+        if use_pinned and self._pinned_filled[sample_idx]:
+            stats = None
+            input_ = self._pinned_cache[sample_idx]
+            # Do the transforms only for training data
+            if self.transforms and sample_idx in self.data_train_inds:
+                input_ = self.transforms(input_)
         else:
-            input_ = self.wkw_read(self.data_sources[source_idx].input_path, bbox_input)
-
-        if normalize:
-            input_ = WkwData.normalize(input_, self.data_sources[source_idx].input_mean,
-                                    self.data_sources[source_idx].input_std)
-
-        input_ = torch.from_numpy(input_).float()
-        # squeeze out the depth dimension if a singleton
-        if self.input_shape[2] == 1 and input_.dim() > 3 and input_.shape[3] == 1:
-            input_ = input_.squeeze(3)
-        # Do the transforms only for training data
-        if self.transforms and sample_idx in self.data_train_inds:
-            input_ = self.transforms(input_)
+            input_ = prefetched
+            if input_ is None and self.sample_cache_max_bytes:
+                input_ = self._sample_cache.get(sample_idx)
+            if input_ is None:
+                if self.cache_RAM | self.cache_HDD:
+                    input_ = self.wkw_read_cached(source_idx, 'input', bbox_input)
+                else:
+                    input_ = self.wkw_read(self.data_sources[source_idx].input_path, bbox_input)
+                if self.sample_cache_max_bytes:
+                    self._sample_cache_put(sample_idx, input_)
+
+            if self.normalize_in_collate:
+                # Defer normalization and the float cast to collate_fn: the raw
+                # (typically uint8) array plus its stats travel with the sample and the
+                # batched tensor is normalized in one pass
+                if normalize:
+                    stats = {'mean': float(self._src['input_mean'][source_idx]),
+                             'std': float(self._src['input_std'][source_idx])}
+                else:
+                    stats = {}
+            elif self.cache_dtype is torch.uint8:
+                # Keep the native 8-bit encoding all the way to the device;
+                # the model front dequantizes (see cache_dtype docstring)
+                stats = None
+                input_ = torch.from_numpy(np.ascontiguousarray(input_))
+                if self.input_shape[2] == 1 and input_.dim() > 3 and input_.shape[3] == 1:
+                    input_ = input_.squeeze(3)
+                if self.transforms and sample_idx in self.data_train_inds:
+                    input_ = self.transforms(input_)
+            else:
+                stats = None
+                if normalize:
+                    input_ = WkwData.normalize(input_, self.data_sources[source_idx].input_mean,
+                                               self.data_sources[source_idx].input_std)
+
+                input_ = torch.from_numpy(input_).float()
+                # squeeze out the depth dimension if a singleton
+                if self.input_shape[2] == 1 and input_.dim() > 3 and input_.shape[3] == 1:
+                    input_ = input_.squeeze(3)
+                if use_pinned:
+                    # Store pre-transform so augmentation stays random per epoch
+                    self._pinned_cache[sample_idx].copy_(input_)
+                    self._pinned_filled[sample_idx] = True
+                    input_ = self._pinned_cache[sample_idx]
+                # Do the transforms only for training data
+                if self.transforms and sample_idx in self.data_train_inds:
+                    input_ = self.transforms(input_)
 
         # Targets
         source_idx, bbox_target = self.get_bbox_for_sample_idx(sample_idx, sample_type='target')
@@ -281,13 +558,12 @@ class WkwData(Dataset):
                 else:
                     target = self.wkw_read(self.data_sources[source_idx].target_path, bbox_target)
 
-        if self.pad_target is True:
-            target = self.pad(target)
-
         if self.data_sources[source_idx].target_binary == 1:
             target = torch.from_numpy(target).long()
         else:
             target = torch.from_numpy(target).float()
+            if self.pad_target is True:
+                target = self.pad(target)
             # Note(AK): The input gets squeezed above and if the input and output are the same
             # then there's no third dimension to squeeze.
             if self.output_shape[2] == 1 and target.dim() > 3 and target.shape[3] == 1:
@@ -295,7 +571,22 @@ class WkwData(Dataset):
             if self.transforms and not inputSameAsOutput:
                 target = self.transforms(target)
 
-        return {'input': input_, 'target': target, 'sample_idx': sample_idx}
+        sample = {'input': input_, 'target': target, 'sample_idx': sample_idx}
+        if stats:
+            sample.update(stats)
+        return sample
+
+    def _sample_cache_put(self, sample_idx, input_):
+        """Store a decoded (pre-normalization) input patch, evicting FIFO when the
+        configured byte budget is exceeded"""
+        input_ = np.ascontiguousarray(input_)
+        if input_.nbytes > self.sample_cache_max_bytes:
+            return
+        while self._sample_cache_bytes + input_.nbytes > self.sample_cache_max_bytes:
+            oldest_idx = next(iter(self._sample_cache))
+            self._sample_cache_bytes -= self._sample_cache.pop(oldest_idx).nbytes
+        self._sample_cache[sample_idx] = input_
+        self._sample_cache_bytes += input_.nbytes
 
     def write_output_to_cache(self,
                               outputs: List[np.ndarray],
@@ -311,48 +602,65 @@ class WkwData(Dataset):
             wkw_path = self.data_sources[source_idx].input_path
             wkw_bbox = self.data_sources[source_idx].input_bbox
 
-            if wkw_path not in self.data_cache_output:
-                self.data_cache_output[wkw_path] = {}
+            # Tuple keys hash in C without formatting the bbox into a string
+            bbox_key = tuple(wkw_bbox)
 
-            if str(wkw_bbox) not in self.data_cache_output[wkw_path]:
-                self.data_cache_output[wkw_path][str(wkw_bbox)] = {}
-
-            if output_label not in self.data_cache_output[wkw_path][str(wkw_bbox)]:
+            label_cache = self.data_cache_output.setdefault(wkw_path, {}).setdefault(bbox_key, {})
+            data = label_cache.get(output_label)
+            if data is None:
+                # NaN marks never-written voxels for interpolate_sparse_cache and
+                # the wkw export, so the one-off cube init has to stay a full fill
                 data = np.full(wkw_bbox[3:6], np.nan, dtype=np.float32)
-                self.data_cache_output[wkw_path][str(wkw_bbox)][output_label] = data
+                label_cache[output_label] = data
 
             data_min = np.asarray(bbox[0:3]) - np.asarray(wkw_bbox[0:3])
             data_max = data_min + np.asarray(bbox[3:6])
-
-            data = self.data_cache_output[wkw_path][str(wkw_bbox)][output_label]
+            # data already aliases the stored array; writing the slice is enough
             data[data_min[0]:data_max[0], data_min[1]:data_max[1], data_min[2]:data_max[2]] = outputs[output_idx].reshape(self.output_shape)
-            self.data_cache_output[wkw_path][str(wkw_bbox)][output_label] = data
 
     def interpolate_sparse_cache(self, output_label, method=None):
         for wkw_path in self.data_cache_output.keys():
             for wkw_bbox in self.data_cache_output[wkw_path].keys():
                 cache = self.data_cache_output[wkw_path][wkw_bbox][output_label]
+                # The dense grid is identical for every z-slice; build it once
+                grid_x, grid_y = np.mgrid[0:cache.shape[0], 0:cache.shape[1]]
+                prev_mask = None
+                points = None
                 for z in range(cache.shape[2]):
                     data = cache[:, :, z]
-                    points = np.argwhere(~np.isnan(data))
+                    mask = np.isnan(data)
+                    if method == 'nearest':
+                        # C-vectorized nearest-neighbor fill: the EDT index map sends
+                        # every NaN pixel to its closest valid pixel without
+                        # rebuilding griddata's kd-tree per slice
+                        inds = distance_transform_edt(mask, return_distances=False,
+                                                      return_indices=True)
+                        cache[:, :, z] = data[inds[0], inds[1]]
+                        continue
+                    # The NaN pattern is usually shared between slices; only redo the
+                    # point extraction when it changes
+                    if prev_mask is None or not np.array_equal(mask, prev_mask):
+                        points = np.argwhere(~mask)
+                        prev_mask = mask
                     values = data[points[:, 0], points[:, 1]]
-                    grid_x, grid_y = np.mgrid[0:data.shape[0], 0:data.shape[1]]
                     data_dense = griddata(points, values, (grid_x, grid_y), method=method)
                     cache[:, :, z] = data_dense
 
     def get_random_sample(self):
         """ Retrieves a random pair of input and target tensors from all available training cubes"""
 
-        sample_idx = random.sample(range(self.data_inds_max[-1]), 1)
+        # randrange draws a single int directly (random.sample built a range and a
+        # one-element list) and includes the last sample, which the old upper
+        # bound left out
+        sample_idx = random.randrange(self.data_inds_max[-1] + 1)
 
         return self.get_ordered_sample(sample_idx)
 
     def pad(self, target):
-        pad_shape = np.floor((np.asarray(self.input_shape) - np.asarray(self.output_shape)) / 2).astype(int)
-        target = np.pad(target,
-                        ((pad_shape[0], pad_shape[0]), (pad_shape[1], pad_shape[1]), (pad_shape[2], pad_shape[2])),
-                        'constant')
-        return target
+        # Pads the trailing (x, y, z) dimensions of the already-tensorized target
+        # with the width precomputed in __init__, using torch's pad kernel instead
+        # of a numpy round trip
+        return F.pad(target, self._pad_width)
 
     def fill_caches(self):
         for data_source_idx, data_source in enumerate(self.data_sources):
@@ -376,10 +684,18 @@ class WkwData(Dataset):
 
         # If cache to RAM is true, save to RAM
         if self.cache_RAM:
+            # For 2-D sampling (singleton z) store the RAM cache z-major: wkw's
+            # native (C, X, Y, Z) layout strides over z last, which scatters every
+            # plane read across the whole cube; z-major keeps each plane
+            # sequential. Only the RAM copy is transposed — the HDD cache below
+            # must stay in the native layout wkw_read expects
+            ram_data = data
+            if self.input_shape[2] == 1:
+                ram_data = np.ascontiguousarray(data.transpose(0, 3, 1, 2))
             if wkw_path not in self.data_cache_input:
-                self.data_cache_input[wkw_path] = {str(wkw_bbox): data}
+                self.data_cache_input[wkw_path] = {tuple(wkw_bbox): ram_data}
             else:
-                self.data_cache_input[wkw_path][str(wkw_bbox)] = data
+                self.data_cache_input[wkw_path][tuple(wkw_bbox)] = ram_data
 
         # If cache to HDD is true, save to HDD
         if self.cache_HDD:
@@ -402,15 +718,28 @@ class WkwData(Dataset):
         abs_pos = self.data_sources[source_idx][key_idx]
 
         # Attempt to load bbox from RAM cache
-        if (wkw_path in self.data_cache_input) & (str(abs_pos) in self.data_cache_input[wkw_path]):
+        if (wkw_path in self.data_cache_input) & (tuple(abs_pos) in self.data_cache_input[wkw_path]):
 
             rel_pos = np.asarray(wkw_bbox[0:3]) - np.asarray(abs_pos[0:3])
-            data = self.data_cache_input[wkw_path][str(abs_pos)][
-                :,
-                rel_pos[0]:rel_pos[0] + wkw_bbox[3],
-                rel_pos[1]:rel_pos[1] + wkw_bbox[4],
-                rel_pos[2]:rel_pos[2] + wkw_bbox[5],
-                ]
+            cached = self.data_cache_input[wkw_path][tuple(abs_pos)]
+            if self.input_shape[2] == 1:
+                # z-major cache layout (see fill_cache): slice the sequential
+                # plane, then hand back a dense (C, X, Y, Z) copy so the
+                # downstream torch.from_numpy(...).float() is a single pass
+                data = cached[
+                    :,
+                    rel_pos[2]:rel_pos[2] + wkw_bbox[5],
+                    rel_pos[0]:rel_pos[0] + wkw_bbox[3],
+                    rel_pos[1]:rel_pos[1] + wkw_bbox[4],
+                    ]
+                data = np.ascontiguousarray(data.transpose(0, 2, 3, 1))
+            else:
+                data = cached[
+                    :,
+                    rel_pos[0]:rel_pos[0] + wkw_bbox[3],
+                    rel_pos[1]:rel_pos[1] + wkw_bbox[4],
+                    rel_pos[2]:rel_pos[2] + wkw_bbox[5],
+                    ]
 
         # Attempt to load bbox from HDD cache
         else:
@@ -449,74 +778,63 @@ class WkwData(Dataset):
                 self.wkw_create(output_wkw_path, output_dtype, output_block_type)
 
             for bbox in self.data_cache_output[path].keys():
-                if (wkw_bbox is not None) and (wkw_bbox != bbox):
+                if (wkw_bbox is not None) and (tuple(wkw_bbox) != bbox):
                     continue
 
                 data = np.expand_dims(output_dtype_fn(self.data_cache_output[path][bbox][output_label])
                                       .astype(output_dtype), axis=0)
-                print('Writing cache to wkw ... ' + output_wkw_path + ' | ' + bbox)
-                bbox_from_str = [int(x) for x in bbox[1:-1].split(',')]
-                self.wkw_write(output_wkw_path, bbox_from_str, data)
+                print('Writing cache to wkw ... ' + output_wkw_path + ' | ' + str(bbox))
+                self.wkw_write(output_wkw_path, list(bbox), data)
 
     def get_bbox_for_sample_idx(self, sample_idx, sample_type='input'):
-        source_idx, mesh_inds = self.get_source_mesh_for_sample_idx(sample_idx)
+        # Origins are precomputed in get_data_ind_ranges, so the hot path is two
+        # table gathers instead of an unravel plus three mesh lookups
         if sample_type == 'input':
+            origin = self._origin_input[sample_idx]
             shape = self.input_shape
         else:
+            origin = self._origin_target[sample_idx]
             shape = self.output_shape
-        origin = [
-            int(self.data_meshes[source_idx][sample_type]['x'][mesh_inds[0], mesh_inds[1], mesh_inds[2]] - np.floor(shape[0] / 2)),
-            int(self.data_meshes[source_idx][sample_type]['y'][mesh_inds[0], mesh_inds[1], mesh_inds[2]] - np.floor(shape[1] / 2)),
-            int(self.data_meshes[source_idx][sample_type]['z'][mesh_inds[0], mesh_inds[1], mesh_inds[2]] - np.floor(shape[2] / 2)),
-        ]
-        bbox = origin + list(shape)
+        source_idx = int(self._source_idx_by_sample[sample_idx])
+        bbox = [int(origin[0]), int(origin[1]), int(origin[2])] + list(shape)
 
         return source_idx, bbox
 
     def get_center_for_sample_idx(self, sample_idx: int, sample_type: str = 'input'):
         """Get the coordinate of the center(mesh) of the sample given by sample idx"""
-        source_idx, mesh_inds = self.get_source_mesh_for_sample_idx(sample_idx)
-        this_mesh = self.data_meshes[source_idx][sample_type]
-        center = [this_mesh[dim][mesh_inds[0], mesh_inds[1], mesh_inds[2]] for dim in['x', 'y', 'z']]
-        return center
+        return self._center_by_sample[sample_idx].tolist()
     
     def get_source_mesh_for_sample_idx(self, sample_idx):
         # Get appropriate training data cube sample_idx based on global linear sample_idx
-        source_idx = int(np.argmax(np.asarray(self.data_inds_max) >= int(sample_idx)))
+        source_idx = int(np.searchsorted(self._data_inds_max_arr, int(sample_idx)))
         # Get appropriate subscript index for the respective training data cube, given the global linear index
         mesh_inds = np.unravel_index(sample_idx - self.data_inds_min[source_idx],
-                                     dims=self.data_meshes[source_idx]['target']['x'].shape)
+                                     self.data_meshes[source_idx]['shape'])
 
         return source_idx, mesh_inds
 
-    @lru_cache(maxsize=128)
     def get_source_idx_from_sample_idx(self, sample_idx):
         """Get the [data]source index from the linear index of the sample"""
-        source_idx = int(np.argmax(np.asarray(self.data_inds_max) >= int(sample_idx)))
-        return source_idx
+        return int(self._source_idx_by_sample[int(sample_idx)])
 
-    @lru_cache(maxsize=128)
     def get_target_from_sample_idx(self, sample_idx):
         """Get the binary target class from the linear index of the sample"""
-        source_idx = self.get_source_idx_from_sample_idx(sample_idx) 
-        target_class = self.data_sources[source_idx].target_class
-        return target_class 
+        return self._target_class_by_sample[int(sample_idx)]
 
     def get_datasources_stats(self, num_samples=30):
         return [self.get_datasource_stats(i, num_samples) for i in range(len(self.data_sources))]
 
     def get_datasource_stats(self, data_source_idx, num_samples=30):
-        sample_inds = np.random.random_integers(self.data_inds_min[data_source_idx],
-                                                self.data_inds_max[data_source_idx], num_samples)
-        means = []
-        stds = []
-        for i, sample_idx in enumerate(sample_inds):
-            print('Getting stats from dataset ... sample {} of {}'.format(i, num_samples))
-            data = self.get_ordered_sample(sample_idx, normalize=False)
-            means.append(np.mean(data['input'].data.numpy()))
-            stds.append(np.std(data['input'].data.numpy()))
-
-        return {'mean': float(np.around(np.mean(means), 1)), 'std': float(np.around(np.mean(stds), 1))}
+        sample_inds = self._rng.integers(self.data_inds_min[data_source_idx],
+                                         self.data_inds_max[data_source_idx],
+                                         num_samples, endpoint=True)
+        print('Getting stats from dataset ... {} samples'.format(int(num_samples)))
+        inputs = np.stack([np.asarray(self.get_ordered_sample(int(sample_idx), normalize=False)['input'],
+                                      dtype=np.float32)
+                           for sample_idx in sample_inds])
+        # One pooled reduction over all voxels: averaging per-sample stds
+        # underestimates the spread whenever the sample means differ
+        return {'mean': float(np.around(inputs.mean(), 1)), 'std': float(np.around(inputs.std(), 1))}
 
     def update_datasources_stats(self, num_samples=30):
         [self.update_datasource_stats(i, num_samples) for i in range(len(self.data_sources))]
@@ -526,6 +844,7 @@ class WkwData(Dataset):
         stats = self.get_datasource_stats(data_source_idx, num_samples)
         self.data_sources[data_source_idx] = self.data_sources[data_source_idx]._replace(input_mean=stats['mean'])
         self.data_sources[data_source_idx] = self.data_sources[data_source_idx]._replace(input_std=stats['std'])
+        self._build_source_soa()
 
     def datasource_id_to_idx(self, id):
         idx = [data_source.id for data_source in self.data_sources].index(id)
@@ -596,33 +915,60 @@ class WkwData(Dataset):
     
     @staticmethod
     def collate_fn(batch):
-        input_ = torch.cat([torch.unsqueeze(item['input'], dim=0) for item in batch], dim=0)
-        target = torch.cat([torch.unsqueeze(item['target'], dim=0) for item in batch], dim=0)
+        if isinstance(batch[0]['input'], np.ndarray):
+            # Raw-mode samples (normalize_in_collate): stack once, convert once and
+            # normalize the whole batch with per-sample stats in a single fused pass
+            input_ = torch.from_numpy(np.stack([item['input'] for item in batch])).float()
+            if 'mean' in batch[0]:
+                stat_shape = (-1,) + (1,) * (input_.dim() - 1)
+                means = torch.tensor([item['mean'] for item in batch],
+                                     dtype=torch.float32).reshape(stat_shape)
+                stds = torch.tensor([item['std'] for item in batch],
+                                    dtype=torch.float32).reshape(stat_shape)
+                input_.sub_(means).div_(stds)
+            # squeeze out the depth dimension if a singleton
+            if input_.dim() > 4 and input_.shape[4] == 1:
+                input_ = input_.squeeze(4)
+        elif batch[0]['input'].is_pinned():
+            # Samples are views into the pinned RAM cache: gather them into a
+            # batch that is itself pinned, so the DataLoader's pin_memory pass
+            # sees an already-pinned tensor and skips its staging copy
+            first = batch[0]['input']
+            input_ = torch.empty((len(batch),) + tuple(first.shape), dtype=first.dtype,
+                                 pin_memory=True)
+            for it, item in enumerate(batch):
+                input_[it].copy_(item['input'])
+        else:
+            # Not a plain default_collate candidate: raw mode and the pinned
+            # gather above need the custom paths, and sample_idx must stay a
+            # plain list. torch.stack does the batching in one call without
+            # materializing the per-sample unsqueeze views.
+            input_ = torch.stack([item['input'] for item in batch])
+        target = torch.stack([item['target'] for item in batch])
         sample_idx = [item['sample_idx'] for item in batch]
         return {'input': input_, 'target': target, 'sample_idx': sample_idx}
 
     @staticmethod
     def normalize(data, mean, std):
-        return (np.asarray(data) - mean) / std
+        # One float32 copy, then in-place ops: avoids the silent float64 promotion
+        # of uint8 - float and the second intermediate of the subtract-then-divide.
+        # The copy is kept because callers pass views into the RAM cache.
+        data = np.asarray(data).astype(np.float32)
+        data -= np.float32(mean)
+        data *= np.float32(1.0 / std)
+        return data
 
     @staticmethod
     def wkw_header(wkw_path):
-        with wkw.Dataset.open(wkw_path) as w:
-            header = w.header
-
-        return header
+        return _wkw_open_cached(wkw_path).header
 
     @staticmethod
     def wkw_read(wkw_path, wkw_bbox):
-        with wkw.Dataset.open(wkw_path) as w:
-            data = w.read(wkw_bbox[0:3], wkw_bbox[3:6])
-
-        return data
+        return _wkw_open_cached(wkw_path).read(wkw_bbox[0:3], wkw_bbox[3:6])
 
     @staticmethod
     def wkw_write(wkw_path, wkw_bbox, data):
-        with wkw.Dataset.open(wkw_path) as w:
-            w.write(wkw_bbox[0:3], data)
+        _wkw_open_cached(wkw_path).write(wkw_bbox[0:3], data)
 
     @staticmethod
     def wkw_create(wkw_path, wkw_dtype=np.uint8, wkw_block_type=1):
@@ -630,6 +976,8 @@ class WkwData(Dataset):
 
     @staticmethod
     def assert_data_completeness(data):
+        if _bounding_faces_nonzero is not None:
+            return bool(_bounding_faces_nonzero(data))
         if (np.any(data[:, 0, :, :]) & np.any(data[:, -1, :, :]) & np.any(data[:, :, 0, :]) & np.any(data[:, :, -1, :])
                 & np.any(data[:, :, :, 0]) & np.any(data[:, :, :, -1])):
             flag = True
@@ -639,37 +987,46 @@ class WkwData(Dataset):
 
     @staticmethod
     def disk_usage(root):
-        total_size = 0
-        for dirpath, dirnames, filenames in os.walk(root):
-            for f in filenames:
-                fp = os.path.join(dirpath, f)
-                if not os.path.islink(fp):
-                    total_size += os.path.getsize(fp)
-
-        return np.floor(total_size/1024/1024)  # MiB
+        # os.scandir reuses the stat information from the directory listing,
+        # avoiding the extra islink/getsize stat calls per file that os.walk
+        # plus os.path needed
+        def walk(directory):
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_symlink():
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        yield from walk(entry.path)
+                    else:
+                        yield entry.stat(follow_symlinks=False).st_size
+
+        total_size = sum(walk(root))
+        return total_size >> 20  # MiB
 
     @staticmethod
     def datasources_bbox_from_json(json_path, bbox_ext, bbox_idx, datasource_idx=0):
         """ Crops out sub bbox from template json given linear index (parallelize over prediction volumes)"""
 
         datasource = WkwData.datasources_from_json(json_path)[datasource_idx]
-        corner_min = (np.ceil(np.array(datasource.input_bbox[0:3])/np.array(bbox_ext))*np.array(bbox_ext)).astype(int)
-        corner_max = (np.floor((np.array(datasource.input_bbox[0:3])+np.array(datasource.input_bbox[3:6]))/
-                              np.array(bbox_ext))*np.array(bbox_ext)).astype(int)
+        ext = np.asarray(bbox_ext)
+        # Snap both bbox corners onto the bbox_ext grid in one vectorized step
+        corners = np.vstack((datasource.input_bbox[0:3], datasource.input_bbox[3:6]))
+        corner_min = (np.ceil(corners[0] / ext) * ext).astype(int)
+        corner_max = (np.floor(corners.sum(axis=0) / ext) * ext).astype(int)
         x = np.arange(corner_min[0], corner_max[0], bbox_ext[0])
         y = np.arange(corner_min[1], corner_max[1], bbox_ext[1])
         z = np.arange(corner_min[2], corner_max[2], bbox_ext[2])
-        xm, ym, zm = np.meshgrid(x, y, z)
+        # Index the 1-D coordinate vectors directly; the dense meshgrid
+        # materialized three O(n^3) arrays just to read one cell of each
         xi, yi, zi = np.unravel_index(bbox_idx, (len(x), len(y), len(z)))
-        bbox = [xm[xi, yi, zi], ym[xi, yi, zi], zm[xi, yi, zi], *bbox_ext]
+        bbox = [int(x[xi]), int(y[yi]), int(z[zi]), *bbox_ext]
         datasource = datasource._replace(input_bbox=bbox, target_bbox=bbox)
 
         return [datasource]
 
     @staticmethod
     def datasources_from_json(json_path):
-        with open(json_path) as f:
-            datasources_dict = json.load(f)
+        datasources_dict = _load_json(json_path)
 
         datasources = []
         for key in datasources_dict.keys():
@@ -680,16 +1037,11 @@ class WkwData(Dataset):
 
     @staticmethod
     def datasources_to_json(datasources, json_path):
-
-        dumps = '{'
-        for datasource_idx, datasource in enumerate(datasources):
-            dumps += '\n    "datasource_{}"'.format(datasource.id) + ': {'
-            dumps += json.dumps(datasource._asdict(), indent=8)[1:-1]
-            dumps += "    },"
-        dumps = dumps[:-1] + "\n}"
-
-        with open(json_path, 'w') as f:
-            f.write(dumps)
+        # Serialize the whole dict in one json.dumps call and write the buffer at
+        # once; the old per-source string concatenation grew quadratically
+        ds_dict = WkwData.convert_ds_to_dict(datasources)
+        with open(json_path, 'w', buffering=1 << 20) as f:
+            f.write(json.dumps(ds_dict, indent=4))
 
     @staticmethod
     def write_short_ds_json(datasources: Union[dict, list], json_path: str, convert_to_short: bool = False):
@@ -702,7 +1054,14 @@ class WkwData(Dataset):
         """
         # convert to shortened form if asked
         if convert_to_short:
-            datasources = WkwData.convert_to_short_ds(data_sources=datasources)
+            if isinstance(datasources, dict):
+                datasources = WkwData.convert_to_short_ds(data_sources=datasources)
+            else:
+                # Materialize the dict form once and thread it through the
+                # pipeline instead of every step re-running _asdict on all sources
+                datasources = WkwData.convert_to_short_ds(
+                    data_sources=datasources,
+                    ds_dict=WkwData.convert_ds_to_dict(datasources))
 
         if not isinstance(datasources, dict):
             ds_dict = WkwData.convert_ds_to_dict(datasources)
@@ -720,40 +1079,35 @@ class WkwData(Dataset):
         Returns:
             datasources: list of DataSources
         """
-        with open(json_path, 'r') as f:
-            ds_dict = json.load(f)
-        # Add shared properties
-        if 'shared_properties' in ds_dict.keys():
-            p_key = 'shared_properties'
-            # Keys of the data sources
-            ds_keys = list(ds_dict.keys())
-            ds_keys.remove('shared_properties')
-            assert all(['datasource_' in key for key in ds_keys]), 'data source key names problem'
-            for key in ds_keys:
-                ds_dict[key].update(ds_dict[p_key])
-            del ds_dict[p_key]
-        # Convert to DataSource list
-        datasources = WkwData.convert_ds_to_list(ds_dict)
-        return datasources
+        ds_dict = _load_json(json_path)
+        # Merge the shared properties into each source while instantiating: one
+        # pass, no mutation of the per-source sub-dicts
+        shared = ds_dict.pop('shared_properties', {})
+        return [DataSource(**{**shared, **cur_ds})
+                for key, cur_ds in ds_dict.items() if key.startswith('datasource_')]
 
     @staticmethod
-    def convert_to_short_ds(data_sources: Union[list, dict], shared_properties: dict = None) -> dict:  
+    def convert_to_short_ds(data_sources: Union[list, dict], shared_properties: dict = None,
+                            ds_dict: dict = None) -> dict:
         """
         Convert to a shortened version of the data sources
         Args:
             data_sources: list of sources with all fields individually given. If given a dict with shared properties, It would do nothing.
             shared_properties: dictionary with the fields shared by all individual data sources.
+            ds_dict: [Optional] pre-built dict form of data_sources (see convert_ds_to_dict),
+                saves re-materializing every namedtuple. Its per-source dicts are edited in place.
         Returns:
-            short_dict: The compact data source with shared properties separated into a separate field. 
+            short_dict: The compact data source with shared properties separated into a separate field.
         """
         # if the given source dict has the 'shared_property' field do nothing and return the dict
         if isinstance(data_sources, dict) and 'shared_properties' in data_sources.keys():
             print('data sources already contains the shared_properties. No change is done')
-            return data_sources 
+            return data_sources
+        if ds_dict is None:
+            ds_dict = WkwData.convert_ds_to_dict(data_sources)
         # if not given, make the shared dict
         if shared_properties is None:
-            shared_properties = WkwData.ds_find_shared_properties(data_sources=data_sources)
-        ds_dict = WkwData.convert_ds_to_dict(data_sources)
+            shared_properties = WkwData.ds_find_shared_properties(ds_dict=ds_dict)
         key2remove_list = list(shared_properties.keys())
         # Loop over each data source
         for ds_key in ds_dict:
@@ -765,38 +1119,31 @@ class WkwData(Dataset):
         return short_dict
 
     @staticmethod
-    def ds_find_shared_properties(data_sources: list) -> dict:
+    def ds_find_shared_properties(data_sources: list = None, ds_dict: dict = None) -> dict:
         """
         Find the properties that are shared amongst all the data_sources
         Note: the equality operator(==) is used for the properties
         Args:
             data_sources: a list of data sources
+            ds_dict: [Optional] pre-built dict form of the sources; read-only here
         Returns:
             shared_prop: Shared properties as a dictionary
         """
-        # Remove the shared properties from the data sources
-        assert isinstance(data_sources, list)
-        long_ds_dict = WkwData.convert_ds_to_dict(data_sources)
-        # Here try to find the common groups in the json
-        # Get data source and per datasource keys
+        if ds_dict is None:
+            assert isinstance(data_sources, list)
+            ds_dict = WkwData.convert_ds_to_dict(data_sources)
+        long_ds_dict = ds_dict
         ds_keys = list(long_ds_dict)
-        per_ds_keys = list(long_ds_dict[ds_keys[0]])
-        # initialize with empty lists for each key
-        list_all = {k: [] for k in per_ds_keys}
-        # get a list of all elements to find shared properties amongst all data sources
-        for key in ds_keys:
+        # Single pass with early abort: start from the first source's properties
+        # and drop a candidate as soon as any source disagrees
+        shared_prop = dict(long_ds_dict[ds_keys[0]])
+        for key in ds_keys[1:]:
             cur_ds = long_ds_dict[key]
-            for per_key in per_ds_keys:
-                list_all[per_key].append(cur_ds[per_key])
-        # Create the shared property dictionary
-        shared_prop = {}
-        for key in list_all:
-            cur_elem_list = list_all[key]
-            cur_elem_iter = iter(cur_elem_list)
-            first = next(cur_elem_iter)
-            is_identical = all(first == x for x in cur_elem_iter)
-            if is_identical:
-                shared_prop.update({key: cur_elem_list[0]})
+            for per_key in list(shared_prop):
+                if cur_ds[per_key] != shared_prop[per_key]:
+                    del shared_prop[per_key]
+            if not shared_prop:
+                break
         return shared_prop
     
     @staticmethod
@@ -810,28 +1157,26 @@ class WkwData(Dataset):
              source_names: The name of jsons. Used as row names in difference dataframes
              target_names: The names for each of the binary target classes 
         """
-        # Read the two jsons
-
         # Check length equality
         assert len(set([len(j) for j in two_datasources])) == 1
 
         t_string = 'target_class'
+        # Vectorized frame comparison instead of a Python loop over every source
+        df_1 = pd.DataFrame.from_dict(two_datasources[0], orient='index')
+        df_2 = pd.DataFrame.from_dict(two_datasources[1], orient='index')
+        assert df_1.index.equals(df_2.index)
+        # assert equality of all fields except for the target class
+        rest_1 = df_1.drop(columns=t_string)
+        rest_2 = df_2.drop(columns=t_string)
+        assert bool((rest_1 == rest_2).all().all())
+        # Record the result for each source with a differing target class
+        mask = df_1[t_string] != df_2[t_string]
         diff_sources = []
-        for index, ((key_1, source_1), (key_2, source_2)) in enumerate(zip(two_datasources[0].items(), two_datasources[1].items())):
-            assert key_1 == key_2
-            # assert equality of all fields except for the target class
-            fields = list(source_1.keys())
-            fields.remove(t_string)
-            for f in fields:
-                assert source_1[f] == source_2[f]
-            # If target class is different record the result for each source as a data frame
-            if source_1[t_string] != source_2[t_string]:
-                cur_diff_dict = dict.fromkeys([key_1])
-                cur_diff_df = pd.DataFrame([source_1[t_string], source_2[t_string]],
-                                           columns=target_names, index=source_names)
-                cur_diff_dict[key_1] = cur_diff_df
-                diff_sources.append(cur_diff_dict)
-            
+        for key in df_1.index[mask]:
+            cur_diff_df = pd.DataFrame([df_1.at[key, t_string], df_2.at[key, t_string]],
+                                       columns=target_names, index=source_names)
+            diff_sources.append({key: cur_diff_df})
+
         return diff_sources
 
     @staticmethod
@@ -868,17 +1213,10 @@ class WkwData(Dataset):
         Returns:
             List of merged data sources
         """
-        all_ds = []
-        for json_path in json_paths_in:
-            cur_ds = WkwData.datasources_from_json(json_path)
-            # Concatenate the data sources from current json to a list of all data sources
-            all_ds = all_ds + cur_ds
-
-        data_sources_out = []
-        for it, cur_data_source in enumerate(all_ds):
-            # Correct the id of the data source (sequential starting at 0)
-            cur_ds_id_corrected = cur_data_source._replace(id=str(it))
-            data_sources_out.append(cur_ds_id_corrected)
+        all_ds = chain.from_iterable(WkwData.datasources_from_json(json_path)
+                                     for json_path in json_paths_in)
+        # Renumber the ids sequentially starting at 0
+        data_sources_out = [cur_ds._replace(id=str(it)) for it, cur_ds in enumerate(all_ds)]
 
         # Write json to a output file if name is given
         if json_path_out is not None:
@@ -887,9 +1225,12 @@ class WkwData(Dataset):
         return data_sources_out
 
     @staticmethod
+    @lru_cache(maxsize=1)
     def get_common_transforms():
         """
         Get the transform object with the common transforms (Flips, rotation90)
+        The Compose object is stateless, so the same instance is cached and
+        shared between callers instead of being rebuilt on every call.
         Args: None
         Returns:
             transformation: the transformation
@@ -29,7 +29,7 @@ class Predictor:
         self.dataloader = dataloader
 
         if output_prob_fn is None:
-            output_prob_fn = lambda x: np.exp(x[:, 1, 0, 0])
+            output_prob_fn = lambda x: torch.exp(x[:, 1, 0, 0])
 
         self.output_dtype_fn = output_dtype_fn
         self.output_dtype = output_dtype
@@ -65,10 +65,12 @@ class Predictor:
             sample_ind_batch = data['sample_idx']
             sample_ind_phase.extend(sample_ind_batch)
             inputs = data['input'].to(self.device)
-            outputs = Predictor.copy2cpu(self.model(inputs))
+            # Apply the probability head on-device so only the reduced result
+            # crosses to the host, instead of the full logit volume
+            probs = Predictor.copy2cpu(self.output_prob_fn(self.model(inputs)))
 
             self.dataloader.dataset.write_output_to_cache(
-                self.output_dtype_fn(self.output_prob_fn(outputs).data.numpy()).astype(self.output_dtype),
+                self.output_dtype_fn(probs.data.numpy()).astype(self.output_dtype),
                 sample_ind_batch, self.output_label)
 
         if self.interpolate is not None:
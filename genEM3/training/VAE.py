@@ -1,5 +1,6 @@
 """Functions used in the training process of VAE"""
 import os
+import pickle
 import shutil
 import torch
 import argparse
@@ -18,12 +19,15 @@ NUM_FACTOR = 10000
 
 def loss_function(recon_x, x, mu, logvar, weight_KLD):
     """Returns the variational loss which is the sum of reconstruction and KL divergence from prior"""
-    img_size_recon = torch.tensor(recon_x.shape[2:4]).prod()
-    img_size_input = torch.tensor(x.shape[2:4]).prod()
+    # plain int products: torch.tensor(...).prod() allocated two tiny tensors per batch
+    img_size_recon = recon_x.shape[2] * recon_x.shape[3]
+    img_size_input = x.shape[2] * x.shape[3]
     # reconstruction loss
     BCE = F.mse_loss(recon_x.view(-1, img_size_recon), x.view(-1, img_size_input), reduction='sum')
-    # KL divergence loss between the posterior and prior of latent space
-    KLD = -0.5 * torch.sum(1 + logvar - mu.pow(2) - logvar.exp())
+    # KL divergence loss between the posterior and prior of latent space.
+    # In-place ops on the fresh pow/exp results keep it to two temporaries
+    # instead of materializing every intermediate of 1 + logvar - mu^2 - e^logvar
+    KLD = 0.5 * torch.sum(mu.pow(2).add_(logvar.exp()).sub_(logvar).sub_(1))
     # Add a dict of separate reconstruction and KL loss
     lossDetail = {'Recon': BCE, 'KLD': KLD, 'weighted_KLD': weight_KLD*KLD}
     return BCE + weight_KLD*KLD, lossDetail
@@ -31,12 +35,12 @@ def loss_function(recon_x, x, mu, logvar, weight_KLD):
 
 def loss_function_predict(recon_x, x, mu, logvar, weight_KLD, reduction: str = 'none'):
     """Returns the variational loss which is the sum of reconstruction and KL divergence from prior"""
-    img_size_recon = torch.tensor(recon_x.shape[2:4]).prod()
-    img_size_input = torch.tensor(x.shape[2:4]).prod()
+    img_size_recon = recon_x.shape[2] * recon_x.shape[3]
+    img_size_input = x.shape[2] * x.shape[3]
     # reconstruction loss
     BCE = torch.sum(F.mse_loss(recon_x.view(-1, img_size_recon), x.view(-1, img_size_input), reduction=reduction), dim=1, keepdim=True)
     # KL divergence loss between the posterior and prior of latent space
-    KLD = -0.5 * torch.sum(1 + logvar - mu.pow(2) - logvar.exp(), dim=1, keepdim=True)
+    KLD = 0.5 * torch.sum(mu.pow(2).add_(logvar.exp()).sub_(logvar).sub_(1), dim=1, keepdim=True)
     # Add a dict of separate reconstruction and KL loss
     lossDetail = {'Recon': BCE, 'KLD': KLD, 'weighted_KLD': weight_KLD*KLD}
     return BCE + weight_KLD*KLD, lossDetail
@@ -50,12 +54,14 @@ def train(epoch: int = None,
           device: torch.device = torch.device('cpu')):
     """training loop on a batch of data"""
     model.train()
-    train_loss = 0
-    detailedLoss = {'Recon': 0.0, 'KLD': 0.0, 'weighted_KLD': 0.0}
+    # Accumulate on-device: loss.item() per batch forces a GPU->CPU sync, so the
+    # totals stay tensors until the end of the epoch
+    train_loss = torch.zeros((), device=device)
+    detailedLoss = {key: torch.zeros((), device=device) for key in ('Recon', 'KLD', 'weighted_KLD')}
     for batch_idx, data in tqdm(enumerate(train_loader), total=len(train_loader), desc='train'):
-        data = data['input'].to(device)
+        data = data['input'].to(device, non_blocking=True)
 
-        optimizer.zero_grad()
+        optimizer.zero_grad(set_to_none=True)
         recon_batch = model(data)
 
         loss, curDetLoss = loss_function(recon_batch,
@@ -63,20 +69,19 @@ def train(epoch: int = None,
                                          model.cur_mu,
                                          model.cur_logvar,
                                          model.weight_KLD)
-        train_loss += (loss.item() / NUM_FACTOR)
+        train_loss += (loss.detach() / NUM_FACTOR)
         # Separate loss
         for key in curDetLoss:
-            detailedLoss[key] += (curDetLoss.get(key) / NUM_FACTOR)
+            detailedLoss[key] += (curDetLoss.get(key).detach() / NUM_FACTOR)
         # Backprop
         loss.backward()
         optimizer.step()
     num_data_points = len(train_loader.dataset.data_train_inds)
-    train_loss /= num_data_points
-    train_loss *= NUM_FACTOR
+    # Single sync per epoch when converting to floats
+    train_loss = train_loss.item() / num_data_points * NUM_FACTOR
 
     for key in detailedLoss:
-        detailedLoss[key] /= num_data_points
-        detailedLoss[key] *= NUM_FACTOR
+        detailedLoss[key] = detailedLoss[key].item() / num_data_points * NUM_FACTOR
 
     return train_loss, detailedLoss
 
@@ -89,38 +94,40 @@ def test(epoch: int = None,
          device: torch.device = torch.device('cpu')):
     """Run inference on a batch of data without"""
     model.eval()
-    test_loss = 0
-    detailedLoss = {'Recon': 0.0, 'KLD': 0.0, 'weighted_KLD': 0.0}
+    test_loss = torch.zeros((), device=device)
+    detailedLoss = {key: torch.zeros((), device=device) for key in ('Recon', 'KLD', 'weighted_KLD')}
     with torch.no_grad():
         for batch_idx, data in tqdm(enumerate(test_loader), total=len(test_loader), desc='test'):
-            data = data['input'].to(device)
+            data = data['input'].to(device, non_blocking=True)
             recon_batch = model(data)
             curLoss, curDetLoss = loss_function(recon_batch, data,
                                                 model.cur_mu, model.cur_logvar, model.weight_KLD)
-            test_loss += (curLoss.item() / NUM_FACTOR)
+            test_loss += (curLoss / NUM_FACTOR)
             # The separate KL and Reconstruction losses
             for key in curDetLoss:
                 detailedLoss[key] += (curDetLoss.get(key) / NUM_FACTOR)
             # Add 8 test images and reconstructions to tensorboard
             if batch_idx == 0:
                 n = min(data.size(0), 8)
+                # One CPU copy serves both halves of the comparison grid
+                data_cpu = data.cpu()
+                recon_cpu = recon_batch.cpu()
                 # concatenate the input data and associated reconstruction
-                comparison = torch.cat([data[:n], recon_batch[:n]]).cpu()
+                comparison = torch.cat([data_cpu[:n], recon_cpu[:n]])
                 comparison_uint8 = undo_normalize(comparison, mean=148.0, std=36.0)
                 img = make_grid(comparison_uint8)
                 writer.add_image('test_reconstruction',
                                  img,
                                  epoch)
+        # Histograms cover the last batch of the epoch, as their tags say
         writer.add_histogram('input_last_batch_test', data.cpu().numpy(), global_step=epoch)
         writer.add_histogram('reconstruction_last_batch_test', recon_batch.cpu().numpy(), global_step=epoch)
     # Divide by the length of the dataset and multiply by factor used for numerical stabilization
     num_data_points = len(test_loader.dataset.data_test_inds)
-    test_loss /= num_data_points
-    test_loss *= NUM_FACTOR
+    test_loss = test_loss.item() / num_data_points * NUM_FACTOR
 
     for key in detailedLoss:
-        detailedLoss[key] /= num_data_points
-        detailedLoss[key] *= NUM_FACTOR
+        detailedLoss[key] = detailedLoss[key].item() / num_data_points * NUM_FACTOR
 
     return test_loss, detailedLoss
 
@@ -129,9 +136,21 @@ def save_checkpoint(state, is_best, outdir='.log'):
     gpath.mkdir(outdir)
     checkpoint_file = os.path.join(outdir, 'checkpoint.pth')
     best_file = os.path.join(outdir, 'model_best.pth')
-    torch.save(state, checkpoint_file)
+    # Protocol 5 serializes the large tensors through out-of-band buffers; the
+    # atomic rename gives the checkpoint a fresh inode every save, so the
+    # best-model hard link below keeps pointing at the bytes it was made for
+    tmp_file = checkpoint_file + '.tmp'
+    torch.save(state, tmp_file, pickle_protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, checkpoint_file)
     if is_best:
-        shutil.copyfile(checkpoint_file, best_file)
+        # Hard-link instead of rewriting the whole checkpoint a second time
+        if os.path.exists(best_file):
+            os.remove(best_file)
+        try:
+            os.link(checkpoint_file, best_file)
+        except OSError:
+            # filesystem without hard-link support
+            shutil.copyfile(checkpoint_file, best_file)
 
 
 def generate_dir_prefix(max_weight_kld: float = 1.0, warmup_bool: bool = True):
@@ -144,24 +163,41 @@ def predict(model: torch.nn.Module = None,
             device: torch.device = torch.device('cpu')):
     """Run inference on a dataset"""
     model.eval()
-    detailedLoss = {'Recon': [], 'KLD': [], 'weighted_KLD': []}
-    latent_params = {'Mu': [], 'logvar': []}
+    detailedLoss = {}
+    latent_params = {}
+    offset = 0
+    pin = device.type == 'cuda'
     with torch.no_grad():
         for batch_idx, data in tqdm(enumerate(data_loader), total=len(data_loader), desc='test'):
-            data = data['input'].to(device)
+            data = data['input'].to(device, non_blocking=True)
             recon_batch = model(data)
             curLoss, curDetLoss = loss_function_predict(recon_batch, data,
                                                         model.cur_mu, model.cur_logvar, model.weight_KLD, reduction='none')
-            # save latent distribtion parameters
-            latent_params['Mu'].append(model.cur_mu)
-            latent_params['logvar'].append(model.cur_logvar)
+            if not latent_params:
+                # Pre-allocate the full host-side outputs once the per-batch
+                # shapes are known; streaming each batch off the device into a
+                # slice avoids holding activations in VRAM and the final
+                # list-then-cat copy of the results
+                num_samples = len(data_loader.dataset)
+                latent_params = {'Mu': torch.empty(num_samples, model.cur_mu.shape[1], pin_memory=pin),
+                                 'logvar': torch.empty(num_samples, model.cur_logvar.shape[1], pin_memory=pin)}
+                detailedLoss = {key: torch.empty(num_samples, value.shape[1], pin_memory=pin)
+                                for key, value in curDetLoss.items()}
+            batch_size = data.shape[0]
+            latent_params['Mu'][offset:offset + batch_size].copy_(model.cur_mu.detach(), non_blocking=True)
+            latent_params['logvar'][offset:offset + batch_size].copy_(model.cur_logvar.detach(), non_blocking=True)
             # The separate KL and Reconstruction losses
             for key in curDetLoss:
                 # The squared error losses are summed within each individual 2D example
-                detailedLoss[key].append(curDetLoss.get(key))
-        # concatenate the result for the different batches
+                detailedLoss[key][offset:offset + batch_size].copy_(curDetLoss.get(key).detach(), non_blocking=True)
+            offset += batch_size
+        if pin:
+            # The device-to-host copies above are asynchronous; wait for them
+            # to land before handing the buffers to the caller
+            torch.cuda.synchronize(device)
+        # trim in case the loader yielded fewer samples than the dataset holds
         for key in latent_params:
-            latent_params[key] = torch.cat(latent_params[key])
+            latent_params[key] = latent_params[key][:offset]
         for key in detailedLoss:
-            detailedLoss[key] = torch.cat(detailedLoss[key])
+            detailedLoss[key] = detailedLoss[key][:offset]
     return {'latent': latent_params, 'loss': detailedLoss}
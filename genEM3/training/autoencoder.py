@@ -22,7 +22,10 @@ class Trainer:
                  device: str = 'cpu',
                  save: bool = False,
                  resume: bool = False,
-                 gpu_id: int = None
+                 gpu_id: int = None,
+                 use_amp: bool = False,
+                 amp_dtype: torch.dtype = torch.bfloat16,
+                 channels_last: bool = False
                  ):
 
         self.run_root = run_root
@@ -39,6 +42,11 @@ class Trainer:
             device = torch.device(torch.cuda.current_device())
         
         self.device = torchDevice(device)
+        # autocast only pays off on CUDA; bfloat16 needs no loss scaler
+        self.use_amp = use_amp and self.device.type == 'cuda'
+        self.amp_dtype = amp_dtype
+        # NHWC conv kernels only pay off on CUDA
+        self.channels_last = channels_last and self.device.type == 'cuda'
         self.log_root = os.path.join(run_root, '.log')
         self.data_loaders = data_loaders
         self.data_lengths = dict(zip(self.data_loaders.keys(), [len(loader) for loader in self.data_loaders]))
@@ -77,21 +85,32 @@ class Trainer:
                     self.model.train(False)
 
                 running_loss = 0.0
-                for i, (data, index) in enumerate(self.data_loaders[phase]):
+                for i, data in enumerate(self.data_loaders[phase]):
                     it += 1
-                    # copy input and targets to the device object
-                    inputs = data['input'].to(self.device)
-                    targets = data['target'].to(self.device)
+                    # copy input and targets to the device object; non_blocking
+                    # overlaps the copy with compute when the loader pins memory
+                    inputs = data['input'].to(self.device, non_blocking=True)
+                    targets = data['target'].to(self.device, non_blocking=True)
+                    if self.channels_last:
+                        inputs = inputs.contiguous(memory_format=torch.channels_last)
                     # zero the parameter gradients
-                    self.optimizer.zero_grad()
-
-                    # forward + backward + optimize
-                    outputs = self.model(inputs)
-                    loss = self.criterion(outputs, targets)
-
-                    if phase == 'train':
-                        loss.backward()
-                        self.optimizer.step()
+                    self.optimizer.zero_grad(set_to_none=True)
+
+                    # forward + backward + optimize; eval phases run under
+                    # inference_mode so no activations are kept for a backward
+                    # pass that never happens
+                    grad_ctx = torch.enable_grad() if phase == 'train' else torch.inference_mode()
+                    with grad_ctx:
+                        with torch.autocast(device_type=self.device.type, dtype=self.amp_dtype,
+                                            enabled=self.use_amp):
+                            outputs = self.model(inputs)
+                        # cast back so the MSE loss and the numpy logging below run in FP32
+                        outputs = outputs.float()
+                        loss = self.criterion(outputs, targets)
+
+                        if phase == 'train':
+                            loss.backward()
+                            self.optimizer.step()
 
                     # print statistics
                     running_loss += loss.item()
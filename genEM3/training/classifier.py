@@ -29,8 +29,14 @@ class Trainer:
                  save_int: int = 1,
                  resume: bool = False,
                  gpu_id: int = None,
-                 balance_factor: List = None):
-        """balance_factor: is a list which contains the balance factor for each training epoch"""
+                 balance_factor: List = None,
+                 use_amp: bool = False,
+                 amp_dtype: torch.dtype = torch.bfloat16,
+                 batch_transforms=None,
+                 channels_last: bool = False):
+        """balance_factor: is a list which contains the balance factor for each training epoch
+        use_amp: run the forward pass under autocast (CUDA only); bfloat16 needs no loss scaler
+        batch_transforms: callable applied to the whole input batch on the device"""
         self.run_name = run_name
         self.run_root = run_root
         self.model = model
@@ -47,6 +53,11 @@ class Trainer:
             device = torch.device(torch.cuda.current_device())
         
         self.device = torchDevice(device)
+        self.use_amp = use_amp and self.device.type == 'cuda'
+        self.amp_dtype = amp_dtype
+        self.batch_transforms = batch_transforms
+        # NHWC conv kernels only pay off on CUDA
+        self.channels_last = channels_last and self.device.type == 'cuda'
         self.log_root = os.path.join(run_root, '.log', run_name)
         self.data_loaders = data_loaders
         # can only get the lengths when a single set of data loaders are used
@@ -119,22 +130,35 @@ class Trainer:
 
                     it += 1
 
-                    # copy input and targets to the device object
-                    inputs = data['input'].to(self.device)
-                    targets = data['target'].to(self.device)
+                    # copy input and targets to the device object; non_blocking
+                    # overlaps the copy with compute when the loader pins memory
+                    inputs = data['input'].to(self.device, non_blocking=True)
+                    targets = data['target'].to(self.device, non_blocking=True)
+                    if self.channels_last:
+                        inputs = inputs.contiguous(memory_format=torch.channels_last)
+                    if self.batch_transforms is not None and phase == 'train':
+                        inputs = self.batch_transforms(inputs)
                     sample_ind_batch = data['sample_idx']
                     sample_ind_phase.extend(sample_ind_batch)
 
                     # zero the parameter gradients
-                    self.optimizer.zero_grad()
-
-                    # forward + backward + optimize
-                    outputs = self.model(inputs).squeeze()
-                    loss = self.criterion(outputs, targets)
-
-                    if phase == 'train':
-                        loss.backward()
-                        self.optimizer.step()
+                    self.optimizer.zero_grad(set_to_none=True)
+
+                    # forward + backward + optimize; eval phases run under
+                    # inference_mode so no activations are kept for a backward
+                    # pass that never happens
+                    grad_ctx = torch.enable_grad() if phase == 'train' else torch.inference_mode()
+                    with grad_ctx:
+                        with torch.autocast(device_type=self.device.type, dtype=self.amp_dtype,
+                                            enabled=self.use_amp):
+                            outputs = self.model(inputs).squeeze()
+                        # cast back so the NLL loss and the numpy logging below run in FP32
+                        outputs = outputs.float()
+                        loss = self.criterion(outputs, targets)
+
+                        if phase == 'train':
+                            loss.backward()
+                            self.optimizer.step()
 
                     inputs, outputs, targets = Trainer.copy2cpu(inputs, outputs, targets)
 
@@ -0,0 +1,162 @@
+"""Shared wiring for the training entry scripts.
+
+The scripts under runs/training duplicate the dataset/loader/model/optimizer
+setup, so performance knobs (pin_memory, persistent workers, autocast,
+torch.compile, cudnn benchmark) had to be edited in every script and drifted
+apart. build_trainer centralizes that wiring: each script builds its model,
+fills a config dict and calls build_trainer(cfg).train().
+
+PYTORCH_CUDA_ALLOC_CONF cannot be set here because it must be exported before
+torch initializes CUDA; the scripts keep their os.environ.setdefault line at
+the very top.
+"""
+import torch
+from genEM3.data import split_cache
+from genEM3.data.prefetch import EpochPrefetcher
+from genEM3.data.sampling import TensorSubsetRandomSampler
+from genEM3.data.wkwdata import WkwData
+from genEM3.util.model import strip_bias_before_bn
+
+# Maps loader phase names to the index attributes of WkwData
+PHASE_INDEX_NAMES = {
+    'train': 'data_train_inds',
+    'val': 'data_validation_inds',
+    'test': 'data_test_inds'}
+
+
+def configure_runtime(device: str):
+    """Set the process-wide CUDA performance knobs (no-ops on CPU runs)"""
+    if device == 'cuda':
+        # Input shapes are fixed per run, so let cuDNN benchmark conv
+        # algorithms once; TF32 matmul for the fully-connected layers
+        torch.backends.cudnn.benchmark = True
+        torch.set_float32_matmul_precision('high')
+        # Raise the recompile budget so the smaller last batch of an epoch
+        # does not evict the compiled graphs
+        torch._dynamo.config.cache_size_limit = 8192
+
+
+def build_dataset(cfg: dict) -> WkwData:
+    """Construct the WkwData dataset described by the config"""
+    data_sources = WkwData.datasources_from_json(cfg['datasources_json_path'])
+    dataset_kwargs = dict(
+        input_shape=cfg['input_shape'],
+        target_shape=cfg['target_shape'],
+        data_sources=data_sources,
+        cache_RAM=cfg.get('cache_RAM', True),
+        cache_HDD=cfg.get('cache_HDD', False))
+    for key in ('transforms', 'normalize', 'cache_dtype', 'cache_HDD_root'):
+        if cfg.get(key) is not None:
+            dataset_kwargs[key] = cfg[key]
+    dataset = WkwData(**dataset_kwargs)
+    if cfg.get('data_split') is not None:
+        # The split is left out of the constructor so the cached index triple
+        # can skip the permutation entirely on a hit
+        split_cache.load_or_build(cfg['datasources_json_path'], cfg['data_split'], dataset)
+    return dataset
+
+
+def build_data_loaders(dataset: WkwData, cfg: dict) -> dict:
+    """Build one loader per requested phase with the shared loader settings"""
+    device = cfg.get('device', 'cpu')
+    num_workers = cfg.get('num_workers', 0)
+    loader_kwargs = dict(
+        dataset=dataset,
+        batch_size=cfg.get('batch_size', 256),
+        num_workers=num_workers,
+        collate_fn=dataset.collate_fn,
+        pin_memory=(device == 'cuda'))
+    if num_workers > 0:
+        # Keep the worker pool alive across epochs and prefetch deeper
+        loader_kwargs.update(persistent_workers=True, prefetch_factor=4)
+
+    data_loaders = dict()
+    for phase in cfg.get('phases', ('train', 'val')):
+        phase_inds = getattr(dataset, PHASE_INDEX_NAMES[phase])
+        if bool(phase_inds):
+            loader = torch.utils.data.DataLoader(
+                sampler=TensorSubsetRandomSampler(phase_inds), **loader_kwargs)
+            if device == 'cuda' and cfg.get('prefetch', True):
+                # Stage batches onto the GPU over a side stream so the H2D
+                # copy overlaps the optimizer step
+                loader = EpochPrefetcher(loader, device)
+            data_loaders[phase] = loader
+    return data_loaders
+
+
+def prepare_model(cfg: dict) -> torch.nn.Module:
+    """Optionally warm-start the encoder from a checkpoint and compile on CUDA"""
+    model = cfg['model']
+    if cfg.get('state_dict_path') is not None:
+        # Load straight to the target device and move the model first, so the
+        # parameters are copied once instead of CPU-staged and moved again;
+        # weights_only skips the general pickle machinery
+        device = cfg.get('device', 'cpu')
+        model = model.to(device)
+        checkpoint = torch.load(cfg['state_dict_path'], map_location=device, weights_only=True)
+        model.load_encoder_state_dict(checkpoint['model_state_dict'])
+        if cfg.get('freeze_expr') is not None:
+            model.freeze_encoder_weights(expr=cfg['freeze_expr'])
+        model.reset_state()
+        # one summary line instead of stdout I/O per parameter tensor
+        num_trainable = sum(p.numel() for p in model.parameters() if p.requires_grad)
+        print('{} trainable params after freezing'.format(num_trainable))
+    if cfg.get('preproc') is not None:
+        # Device-side preprocessing (e.g. preproc.Normalize dequantizing uint8
+        # batches). Attached as a forward pre-hook rather than an nn.Sequential
+        # wrapper so model attributes (epoch, classifier, ...) and state-dict
+        # keys stay unchanged; compile traces through the hook and fuses it
+        preproc = cfg['preproc']
+        model.register_forward_pre_hook(lambda module, args: (preproc(args[0]),) + args[1:])
+    if cfg.get('strip_conv_bias', True):
+        # BatchNorm cancels a preceding conv bias; drop the redundant add
+        strip_bias_before_bn(model)
+    if cfg.get('device') == 'cuda' and cfg.get('channels_last', True):
+        # NHWC layout routes the convs onto the Tensor-Core kernels; the
+        # trainers convert the input batches to match
+        model = model.to(memory_format=torch.channels_last)
+    if cfg.get('device') == 'cuda' and cfg.get('compile_model', True):
+        # Inductor fuses the pointwise/BN/activation chains of the conv
+        # stacks; compile stays off on CPU where it tends to regress
+        model = torch.compile(model, mode='default', fullgraph=False, dynamic=False)
+    return model
+
+
+def build_trainer(cfg: dict):
+    """Assemble dataset, loaders, model and optimizer into a ready Trainer"""
+    device = cfg.get('device', 'cpu')
+    configure_runtime(device)
+
+    dataset = cfg.get('dataset')
+    if dataset is None:
+        dataset = build_dataset(cfg)
+    data_loaders = cfg.get('data_loaders')
+    if data_loaders is None:
+        data_loaders = build_data_loaders(dataset, cfg)
+
+    model = prepare_model(cfg)
+    optimizer = cfg['optimizer_fn'](model.parameters())
+
+    trainer_kwargs = dict(
+        run_root=cfg['run_root'],
+        model=model,
+        optimizer=optimizer,
+        criterion=cfg['criterion'],
+        data_loaders=data_loaders,
+        num_epoch=cfg.get('num_epoch', 100),
+        log_int=cfg.get('log_int', 10),
+        device=device,
+        save=cfg.get('save', False),
+        resume=cfg.get('resume', False),
+        gpu_id=cfg.get('gpu_id'),
+        use_amp=cfg.get('use_amp', False),
+        channels_last=cfg.get('channels_last', True))
+
+    if cfg.get('trainer', 'classifier') == 'classifier':
+        from genEM3.training.classifier import Trainer
+        trainer_kwargs.update(run_name=cfg.get('run_name', 'run'),
+                              save_int=cfg.get('save_int', 1),
+                              batch_transforms=cfg.get('batch_transforms'))
+    else:
+        from genEM3.training.autoencoder import Trainer
+    return Trainer(**trainer_kwargs)
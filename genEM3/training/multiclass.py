@@ -120,7 +120,7 @@ class Trainer:
                     type_indices = self.get_target_type_index()
                     targets = data['target'][:, type_indices].float().squeeze().to(self.device)
                     # Zero the parameter gradients
-                    self.optimizer.zero_grad()
+                    self.optimizer.zero_grad(set_to_none=True)
                     # Forward pass
                     outputs = self.model(inputs).squeeze()
                     loss = self.criterion(outputs, targets)
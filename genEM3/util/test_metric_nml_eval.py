@@ -54,8 +54,10 @@ for plane_group in skel.groups:
 
         c_id = np.argmax(np.bincount(skel.edges[tree_idx].flatten()))
         c_abs = skel.nodes[tree_idx].loc[skel.nodes[tree_idx]['id'] == c_id, 'position'].values[0].astype(int)
-        c_rel = c_abs - np.array(input_bbox[0:3])
-        prob = dataset.data_cache_input[input_path][str(input_bbox)][0, c_rel[0], c_rel[1], c_rel[2]]
+        # Single-voxel read through the cache accessor, which compensates for
+        # the z-major RAM cache layout (see WkwData.fill_cache)
+        prob = dataset.wkw_read_cached(
+            0, 'input', [int(c_abs[0]), int(c_abs[1]), int(c_abs[2]), 1, 1, 1])[0, 0, 0, 0]
         plane_df = plane_df.append({
             'tree_idx': tree_idx,
             'tree_id': skel.tree_ids[tree_idx],
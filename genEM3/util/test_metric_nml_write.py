@@ -24,13 +24,17 @@ dataset = WkwData(
 
 bbox_val_dims_vx = np.array(bbox_val_dims_um) * 1000 / np.array(scale)
 n_fits = np.ceil((bbox_val_dims_vx - np.array(input_shape)) / np.array(stride)).astype(int)
-meshes = dataset.data_meshes[0]['input']
-meshes_shape = np.array(meshes['x'].shape)
+# The mesh stores 1-D coordinate vectors per axis (plus the virtual dense
+# shape); crop the central n_fits window per axis instead of slicing a dense
+# meshgrid
+meshes = dataset.data_meshes[0]
+meshes_shape = np.array([len(meshes['x']), len(meshes['y']), len(meshes['z'])])
 meshes_center = np.floor(meshes_shape / 2)
 meshes_min = np.floor(meshes_center - n_fits/2).astype(int)
 meshes_max = np.floor(meshes_center + n_fits/2).astype(int)
 
-meshes_val = {key: meshes[key][meshes_min[0]:meshes_max[0], meshes_min[1]:meshes_max[1], meshes_min[2]:meshes_max[2]] for key in meshes}
+meshes_val = {key: meshes[key][meshes_min[i]:meshes_max[i]]
+              for i, key in enumerate(('x', 'y', 'z'))}
 
 skel = Skeleton(os.path.join(get_runs_dir(), 'inference/ae_classify_11_parallel/empty.nml'))
 min_id = 1
@@ -38,9 +42,9 @@ for idx in range(np.prod(n_fits)):
     print('adding trees {}/{}'.format(idx, np.prod(n_fits)))
     xi, yi, zi = np.unravel_index(idx, shape=n_fits)
 
-    cx = meshes_val['x'][xi, yi, zi]
-    cy = meshes_val['y'][xi, yi, zi]
-    cz = meshes_val['z'][xi, yi, zi]
+    cx = meshes_val['x'][xi]
+    cy = meshes_val['y'][yi]
+    cz = meshes_val['z'][zi]
     positions = np.array([
         [cx, cy, cz],
         [cx - input_shape[0]/2, cy - input_shape[1]/2, cz],
@@ -94,12 +94,12 @@ def main():
     train_sampler = SubsetRandomSampler(dataset.data_train_inds)
     train_loader = torch.utils.data.DataLoader(
         dataset=dataset, batch_size=args.batch_size, num_workers=num_workers, sampler=train_sampler,
-        collate_fn=dataset.collate_fn)
+        collate_fn=dataset.collate_fn, pin_memory=True)
 
     test_sampler = SubsetRandomSampler(dataset.data_test_inds)
     test_loader = torch.utils.data.DataLoader(
         dataset=dataset, batch_size=args.batch_size, num_workers=num_workers, sampler=test_sampler,
-        collate_fn=dataset.collate_fn)
+        collate_fn=dataset.collate_fn, pin_memory=True)
     # Model and optimizer definition
     input_size = 140
     output_size = 140
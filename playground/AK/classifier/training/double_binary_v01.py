@@ -8,7 +8,7 @@ from genEM3.data import transforms
 from genEM3.data.wkwdata import WkwData, DataSplit
 from genEM3.model.autoencoder2d import Encoder_4_sampling_bn_1px_deep_convonly_skip, AE_Encoder_Classifier, Classifier3LayeredNoLogSoftmax
 from genEM3.training.multiclass import Trainer
-from genEM3.data.sampling import subsetWeightedSampler
+from genEM3.data.sampling import subsetWeightedSampler, lazyDataLoaderList
 from genEM3.util.path import get_data_dir, gethostnameTimeString
 
 import matplotlib
@@ -54,20 +54,19 @@ loader_interval = 3000
 fraction_debris = [0.2, 0.2]
 fraction_debris_per_block = np.linspace(fraction_debris[0], fraction_debris[1], num=int(num_epoch/loader_interval))
 report_composition = False
-# list of data loaders each contains a dictionary for train and validation loaders
-data_loaders = []
-for i, cur_fraction_debris in enumerate(fraction_debris_per_block):
-    cur_loader = subsetWeightedSampler.get_data_loaders(dataset,
-                                                        fraction_debris=cur_fraction_debris,
-                                                        batch_size=batch_size,
-                                                        artefact_dim=0,
-                                                        num_workers=num_workers)
-    # Look at the iterator
-    data_loaders.append(cur_loader)
-    if report_composition:
+# list of data loaders each contains a dictionary for train and validation loaders.
+# Each entry is constructed lazily when the trainer first reaches its block, so
+# startup does not fork num_workers processes per block
+data_loaders = lazyDataLoaderList(dataset,
+                                  fraction_debris_per_block,
+                                  batch_size=batch_size,
+                                  artefact_dim=0,
+                                  num_workers=num_workers)
+if report_composition:
+    for i, cur_fraction_debris in enumerate(fraction_debris_per_block):
         print(f'**********\nExpected fraction debris in training data loader: {cur_fraction_debris*100} %')
         print(f'Loader dict ID: {i+1} of {len(fraction_debris_per_block)}\n***********')
-        subsetWeightedSampler.report_loader_composition(dataloader_dict=cur_loader,
+        subsetWeightedSampler.report_loader_composition(dataloader_dict=data_loaders[i],
                                                         artefact_dim=0,
                                                         report_batch_data=False)
 
@@ -53,7 +53,7 @@ checkpoint = torch.load(state_dict_path, map_location=lambda storage, loc: stora
 state_dict = checkpoint['model_state_dict']
 model.load_state_dict(state_dict)
 
-output_prob_fn = lambda x: np.exp(x[:, 1])
+output_prob_fn = lambda x: torch.exp(x[:, 1])
 
 def prob_collate_fn(outputs):
     outputs_collate = np.exp(outputs)[:, 1, 0, 0]
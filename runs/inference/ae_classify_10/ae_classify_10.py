@@ -48,14 +48,19 @@ dataset = WkwData(
     cache_HDD_root=cache_HDD_root
 )
 
+# Keep the worker pool alive across prediction passes and prefetch deeper so
+# the wkw reads stay ahead of the model; pinning only pays off on GPU runs
 prediction_loader = torch.utils.data.DataLoader(
-    dataset=dataset, batch_size=batch_size, num_workers=num_workers)
+    dataset=dataset, batch_size=batch_size, num_workers=num_workers,
+    pin_memory=(device != 'cpu'), persistent_workers=True, prefetch_factor=4)
 
 checkpoint = torch.load(state_dict_path, map_location=lambda storage, loc: storage)
 state_dict = checkpoint['model_state_dict']
 model.load_state_dict(state_dict)
 
-output_prob_fn = lambda x: np.exp(x[:, 1, 0, 0])
+# torch.exp runs on the inference device; the numpy version forced a host copy
+# of the full logit batch before reducing it
+output_prob_fn = lambda x: torch.exp(x[:, 1, 0, 0])
 # output_dtype = np.uint8
 output_dtype = np.float32
 # output_dtype_fn = lambda x: (logit(x) + 16) * 256 / 32
@@ -65,7 +65,7 @@ def predict_bbox_from_json(bbox_idx, verbose=True):
     state_dict = checkpoint['model_state_dict']
     model.load_state_dict(state_dict)
 
-    output_prob_fn = lambda x: np.exp(x[:, 1, 0, 0])
+    output_prob_fn = lambda x: torch.exp(x[:, 1, 0, 0])
     # output_dtype = np.uint8
     output_dtype = np.float32
     # output_dtype_fn = lambda x: (logit(x) + 16) * 256 / 32
@@ -1,14 +1,10 @@
 import os
-import time
 import torch
-import numpy as np
-from matplotlib import pyplot as plt
 from torch.utils.data import DataLoader
 
-from genEM3.data.wkwdata import WkwData
-from genEM3.data.normalize import Normalizer
+from genEM3.data.wkwdata import WkwData, DataSplit
 from genEM3.model.autoencoder2d import AE, Encoder_4_sampling_bn, Decoder_4_sampling_bn
-from genEM3.training.autoencoder import Trainer
+from genEM3.training.entry import build_trainer
 
 # Parameters
 run_root = os.path.dirname(os.path.abspath(__file__))
@@ -18,11 +14,14 @@ wkw_root = '/tmpscratch/webknossos/Connectomics_Department/' \
 
 cache_root = os.path.join(run_root, '.cache/')
 datasources_json_path = os.path.join(run_root, 'datasources.json')
-data_strata = {'training': [1, 2], 'validate': [3], 'test': []}
+# Strata split by datasource id: sources 1 and 2 train, source 3 validates
+data_split = DataSplit(train=[1, 2], validation=[3], test=[])
 input_shape = (302, 302, 1)
 output_shape = (302, 302, 1)
-norm_mean = 148.0
-norm_std = 36.0
+device = 'cpu'
+# Overlap wkw reads/decompression with the training step instead of blocking
+# the main thread on IO
+num_workers = min(8, max(2, (os.cpu_count() or 2) // 2))
 
 # Run
 data_sources = WkwData.datasources_from_json(datasources_json_path)
@@ -30,21 +29,24 @@ data_sources = WkwData.datasources_from_json(datasources_json_path)
 # With Caching (cache filled)
 dataset = WkwData(
     data_sources=data_sources,
-    data_strata=data_strata,
+    data_split=data_split,
     input_shape=input_shape,
     target_shape=output_shape,
-    norm_mean=norm_mean,
-    norm_std=norm_std,
+    # Normalization uses the per-source stats from datasources.json; it has to
+    # stay in the Dataset here because the reconstruction target is the input
+    # and must live in the same normalized space
     cache_RAM=True,
     cache_HDD=True,
     cache_HDD_root=cache_root,
 )
 
-dataloader = DataLoader(dataset, batch_size=24, shuffle=False, num_workers=0)
+# Sequential loader over the whole dataset; handed to build_trainer pre-built
+# because the strata-based split has no train/val index attributes
+dataloader = DataLoader(dataset, batch_size=24, shuffle=False, num_workers=num_workers,
+                        pin_memory=(device == 'cuda'), persistent_workers=True)
 
 input_size = 302
 output_size = input_size
-valid_size = 17
 kernel_size = 3
 stride = 1
 n_fmaps = 8
@@ -52,20 +54,17 @@ n_latent = 5000
 model = AE(
     Encoder_4_sampling_bn(input_size, kernel_size, stride, n_fmaps, n_latent),
     Decoder_4_sampling_bn(output_size, kernel_size, stride, n_fmaps, n_latent))
-criterion = torch.nn.MSELoss()
-optimizer = torch.optim.SGD(model.parameters(), lr=0.025, momentum=0.8)
-
-num_epoch = 10
-log_int = 10
-device = 'cpu'
 
-trainer = Trainer(run_root,
-                  dataloader,
-                  model,
-                  optimizer,
-                  criterion,
-                  num_epoch,
-                  log_int,
-                  device)
+cfg = dict(
+    trainer='autoencoder',
+    run_root=run_root,
+    dataset=dataset,
+    data_loaders={'train': dataloader},
+    device=device,
+    model=model,
+    optimizer_fn=lambda params: torch.optim.SGD(params, lr=0.025, momentum=0.8),
+    criterion=torch.nn.MSELoss(),
+    num_epoch=10,
+    log_int=10)
 
-trainer.train()
+build_trainer(cfg).train()
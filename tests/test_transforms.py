@@ -0,0 +1,44 @@
+""" This module contains the tests for the normalization transforms. The transforms map input
+    tensors to specific desired distributions. """
+import torch
+
+from genEM3.data.transforms.compose import Compose
+from genEM3.data.transforms.normalize import ToStandardNormal, ToZeroOneRange
+
+
+def test_toStandardNormal_matchesNaiveForm():
+    """Test that the fused affine form matches the naive (x - mean) / std"""
+    mean, std = 136.0, 40.0
+    transform = ToStandardNormal(mean=mean, std=std)
+    input_data = torch.rand(1, 28, 28) * 255
+    expected = (input_data - mean) / std
+    assert torch.allclose(transform(input_data), expected, atol=1e-6)
+
+
+def test_toStandardNormal_inplaceSharesStorage():
+    """Test that the inplace mode writes into the input tensor without reallocating"""
+    transform = ToStandardNormal(mean=136.0, std=40.0, inplace=True)
+    input_data = torch.rand(1, 28, 28) * 255
+    expected = (input_data - 136.0) / 40.0
+    output = transform(input_data)
+    assert output.data_ptr() == input_data.data_ptr()
+    assert torch.allclose(output, expected, atol=1e-6)
+
+
+def test_compose_fusesAffineChain():
+    """Test that Compose collapses chained affine transforms into an equivalent one"""
+    first = ToZeroOneRange(minimum=0, maximum=255)
+    second = ToStandardNormal(mean=0.5, std=0.25)
+    composed = Compose([first, second])
+    assert len(composed.transforms) == 1
+    input_data = torch.rand(1, 28, 28) * 255
+    expected = second(first(input_data))
+    assert torch.allclose(composed(input_data), expected, atol=1e-6)
+
+
+def test_toZeroOneRange_limitsRange():
+    """Test that the transform maps the [minimum, maximum] range onto [0, 1]"""
+    transform = ToZeroOneRange(minimum=0, maximum=255)
+    input_data = torch.tensor([0.0, 127.5, 255.0])
+    expected = torch.tensor([0.0, 0.5, 1.0])
+    assert torch.allclose(transform(input_data), expected, atol=1e-6)
@@ -6,7 +6,10 @@ import pytest
 from typing import List
 import itertools
 
-from genEM3.data.wkwdata import WkwData, DataSplit
+import numpy as np
+import wkw
+
+from genEM3.data.wkwdata import WkwData, DataSource, DataSplit
 import genEM3.util.path as gpath
 from genEM3.data.transforms.normalize import ToZeroOneRange
 
@@ -87,3 +90,47 @@ def test_indexCoversRange(wkwdataset):
     # Also make sure that indices are continous (no edge cases are accidentally ignored)
     continousIndices = set(range(len(setOfIndices)))
     assert setOfIndices == continousIndices
+
+
+@pytest.fixture(scope='module')
+def localwkwdataset(tmp_path_factory):
+    """Construct a WkwData over a small locally generated wkw cube with both the
+        RAM and the HDD cache enabled"""
+    np.random.seed(1338)
+    root = tmp_path_factory.mktemp('wkw')
+    wkw_path = os.path.join(str(root), 'color', '1')
+    wkw.Dataset.create(wkw_path, wkw.Header(voxel_type=np.uint8))
+    bbox = [0, 0, 0, 32, 32, 4]
+    data = np.random.randint(0, 256, size=(1, 32, 32, 4), dtype=np.uint8)
+    with wkw.Dataset.open(wkw_path) as ds:
+        ds.write(bbox[0:3], data)
+    data_sources = [DataSource(
+        id=1, input_path=wkw_path, input_bbox=bbox, input_mean=148.0, input_std=36.0,
+        target_path=wkw_path, target_bbox=bbox, target_class=0.0, target_binary=1)]
+    dataset = WkwData(
+        input_shape=(8, 8, 1),
+        target_shape=(8, 8, 1),
+        data_sources=data_sources,
+        cache_RAM=True,
+        cache_HDD=True,
+        cache_HDD_root=os.path.join(str(root), '.cache/'))
+    return dataset, data
+
+
+def test_hddCacheKeepsNativeLayout(localwkwdataset):
+    """Test that with RAM and HDD caching combined the HDD cache is written in the
+        native (C, X, Y, Z) wkw layout; only the RAM copy is stored z-major"""
+    dataset, data = localwkwdataset
+    source = dataset.data_sources[0]
+    cache_path = os.path.join(dataset.cache_HDD_root, source.input_path[1::])
+    cached = dataset.wkw_read(cache_path, source.input_bbox)
+    assert np.array_equal(cached, data)
+
+
+def test_cachedReadMatchesNativeRead(localwkwdataset):
+    """Test that wkw_read_cached returns the same voxels as a direct wkw read
+        despite the z-major RAM cache layout of singleton-z configurations"""
+    dataset, data = localwkwdataset
+    for (x, y, z) in [(0, 0, 0), (5, 9, 3), (31, 31, 2)]:
+        read = dataset.wkw_read_cached(0, 'input', [x, y, z, 1, 1, 1])
+        assert read[0, 0, 0, 0] == data[0, x, y, z]